@@ -0,0 +1,131 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""asyncio interface of the MCP9808 library, the bus transactions run on a single worker thread per
+I2C bus so they never block the event loop and never overlap on the same bus:
+
+	from MCP9808.aio import AsyncMCP9808
+
+	async def main():
+		sensor = AsyncMCP9808(busnum=1)
+		await sensor.begin()
+		await sensor.setResolution(0.25)
+		async for reading in sensor.readings():
+			print(reading.tempC)
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import threading
+
+from MCP9808.mcp9808 import MCP9808, MCP9808Config, MCP9808_I2CADDR_DEFAULT
+from MCP9808.schedule import Schedule
+
+# Executor of every bus, created on first use.
+_executors = {}
+_executorsLock = threading.Lock()
+
+
+def getBusExecutor(busnum=None):
+	"""Return the single worker executor that runs the transactions of a bus"""
+	with _executorsLock:
+		executor = _executors.get(busnum)
+		if executor is None:
+			executor = _executors[busnum] = ThreadPoolExecutor(max_workers=1)
+		return executor
+
+
+def _awaitable(name):
+	# Build a method returning an awaitable that runs the MCP9808 method on the bus executor
+	method = getattr(MCP9808, name)
+
+	@functools.wraps(method)
+	def wrapper(self, *args, **kwargs):
+		return self.run(name, *args, **kwargs)
+	return wrapper
+
+
+class AsyncMCP9808(object):
+	"""Awaitable counterpart of MCP9808, every MCP9808 method has an awaitable method with the same name
+	and arguments. The arguments of the constructor are the same as MCP9808 plus the executor, by default
+	the executor shared by every sensor on the same bus number. The MCP9808 is created on the executor
+	so the bus setup does not block the event loop either, it happens on the first call.
+	"""
+
+	def __init__(self, address=MCP9808_I2CADDR_DEFAULT, i2c=None, executor=None, sensor=None, **kwargs):
+		if executor is None:
+			executor = getBusExecutor(kwargs.get('busnum'))
+		self._executor = executor
+		self._address = address
+		self._i2c = i2c
+		self._kwargs = kwargs
+		self.sensor = sensor
+
+	def _call(self, function, args, kwargs):
+		# Runs on the bus executor
+		if self.sensor is None:
+			self.sensor = MCP9808(address=self._address, i2c=self._i2c, **self._kwargs)
+		if isinstance(function, str):
+			function = getattr(self.sensor, function)
+		return function(*args, **kwargs)
+
+	def run(self, function, *args, **kwargs):
+		"""Run a blocking callable, or the name of a MCP9808 method, on the bus executor and return an awaitable
+		with its result"""
+		loop = asyncio.get_running_loop()
+		return loop.run_in_executor(self._executor, self._call, function, args, kwargs)
+
+	async def conversionTime(self):
+		"""Return the conversion time in seconds for the current resolution"""
+		return await self.run('conversionTime')
+
+	async def configure(self, clear=False, verify=False, **bits):
+		"""Change several config register bits with a single write, the keyword arguments are the
+		MCP9808Config bit properties, returns the value written or read back if verify is True:
+
+			await sensor.configure(alert_ctrl=True, hysteresis=1.5)
+		"""
+		for name in bits:
+			if not isinstance(getattr(MCP9808Config, name, None), property):
+				raise AttributeError('{0} is not a MCP9808Config bit'.format(name))
+		def apply():
+			cfg = self.sensor.configure(clear=clear, verify=verify).begin()
+			for name, value in bits.items():
+				setattr(cfg, name, value)
+			return cfg.commit()
+		return await self.run(apply)
+
+	async def readings(self, period=None):
+		"""Asynchronous iterator yielding a MCP9808Reading every period seconds, by default every
+		conversion time of the resolution in effect when the iteration started"""
+		if period is None:
+			period = await self.conversionTime()
+		loop = asyncio.get_running_loop()
+		schedule = Schedule(period, loop.time)
+		while True:
+			yield await self.run('read')
+			await asyncio.sleep(schedule.advance())
+
+
+# Awaitable version of every public MCP9808 method
+for _name in dir(MCP9808):
+	if not _name.startswith('_') and callable(getattr(MCP9808, _name)) and not hasattr(AsyncMCP9808, _name):
+		setattr(AsyncMCP9808, _name, _awaitable(_name))
+del _name
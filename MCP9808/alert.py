@@ -0,0 +1,237 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Wait for the MCP9808 ALERT output on a GPIO pin instead of polling getAlertOutput() over I2C. The
+pin is a backend object with wait(timeout), value() and close(), GPIOCharDevPin uses the Linux GPIO
+character device, SoftwarePin and SimulatedAlertPin are software stand ins:
+
+	from MCP9808.alert import MCP9808Alert, GPIOCharDevPin
+
+	sensor.setUpperTemp(30.0)
+	sensor.setAlertCtrl()
+	alert = MCP9808Alert(sensor, GPIOCharDevPin('/dev/gpiochip0', 17))
+	reading = alert.wait(timeout=60.0)
+	if reading is not None and reading.upper:
+		print('Too hot: {0}'.format(reading.tempC))
+"""
+import errno
+import fcntl
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+from MCP9808.mcp9808 import MCP9808_REG_AMBIENT_TEMP, MCP9808_REG_CONFIG_ALERTMODE, MCP9808Reading, _monotonic
+
+# Linux GPIO character device ABI v1, see include/uapi/linux/gpio.h.
+GPIO_GET_LINEEVENT_IOCTL       = 0xC030B404
+GPIOHANDLE_GET_LINE_VALUES_IOCTL = 0xC040B408
+GPIOHANDLE_REQUEST_INPUT       = 0x01
+GPIOEVENT_REQUEST_RISING_EDGE  = 0x01
+GPIOEVENT_REQUEST_FALLING_EDGE = 0x02
+GPIOEVENT_REQUEST_BOTH_EDGES   = 0x03
+
+_GPIO_EDGES = {
+	'rising': GPIOEVENT_REQUEST_RISING_EDGE,
+	'falling': GPIOEVENT_REQUEST_FALLING_EDGE,
+	'both': GPIOEVENT_REQUEST_BOTH_EDGES,
+}
+
+# struct gpioevent_request and struct gpioevent_data.
+_eventRequest = struct.Struct('=III32si')
+_eventData = struct.Struct('=QI4x')
+
+
+class GPIOCharDevPin(object):
+	"""GPIO line of a Linux GPIO character device requested for edge events. The ALERT output is active
+	low by default (see setAlertPol()) so the default edge is 'falling'. The ioctl argument replaces
+	fcntl.ioctl, it allows to run without a GPIO chip."""
+
+	def __init__(self, chip='/dev/gpiochip0', line=0, edge='falling', consumer='MCP9808', ioctl=fcntl.ioctl):
+		self._ioctl = ioctl
+		request = bytearray(_eventRequest.pack(line, GPIOHANDLE_REQUEST_INPUT, _GPIO_EDGES[edge],
+			consumer.encode('ascii')[:31], 0))
+		chipfd = os.open(chip, os.O_RDONLY)
+		try:
+			self._ioctl(chipfd, GPIO_GET_LINEEVENT_IOCTL, request, True)
+		finally:
+			os.close(chipfd)
+		self._fd = _eventRequest.unpack(bytes(request))[4]
+
+	def fileno(self):
+		return self._fd
+
+	def wait(self, timeout=None):
+		"""Wait for an edge, returns the kernel timestamp of the event in nanoseconds or None on timeout"""
+		if self._fd is None:
+			raise ValueError('The pin is closed')
+		readable, _, _ = select.select([self._fd], [], [], timeout)
+		if not readable:
+			return None
+		data = os.read(self._fd, _eventData.size)
+		timestamp, event = _eventData.unpack(data)
+		return timestamp
+
+	def value(self):
+		"""Return the current level of the line, 0 or 1"""
+		data = bytearray(64)
+		self._ioctl(self._fd, GPIOHANDLE_GET_LINE_VALUES_IOCTL, data, True)
+		return data[0]
+
+	def close(self):
+		if self._fd is not None:
+			os.close(self._fd)
+			self._fd = None
+
+
+class SoftwarePin(object):
+	"""Pin driven from software, trigger() simulates an edge"""
+
+	def __init__(self):
+		self._event = threading.Event()
+		self._level = 1
+		self._timestamp = None
+
+	def trigger(self, level=0):
+		"""Change the pin level and signal an edge"""
+		self._level = level
+		self._timestamp = int(_monotonic() * 1e9)
+		self._event.set()
+
+	def wait(self, timeout=None):
+		if not self._event.wait(timeout):
+			return None
+		self._event.clear()
+		return self._timestamp
+
+	def value(self):
+		return self._level
+
+	def close(self):
+		pass
+
+
+class SimulatedAlertPin(object):
+	"""Pin connected to the ALERT output of a simulator.SimulatedMCP9808, an edge is the output going
+	from not asserted to asserted. The output is sampled every interval seconds without using the
+	simulated bus."""
+
+	def __init__(self, device, interval=0.001):
+		self._device = device
+		self.interval = interval
+		self._asserted = device.alert
+
+	def wait(self, timeout=None):
+		deadline = None if timeout is None else _monotonic() + timeout
+		while True:
+			asserted = self._device.alert
+			edge = asserted and not self._asserted
+			self._asserted = asserted
+			if edge:
+				return int(_monotonic() * 1e9)
+			if deadline is not None and _monotonic() >= deadline:
+				return None
+			time.sleep(self.interval)
+
+	def value(self):
+		# Active low output
+		return 0 if self._device.alert else 1
+
+	def close(self):
+		pass
+
+
+class MCP9808Alert(object):
+	"""ALERT output of a MCP9808 wired to a pin backend. wait() blocks on the pin, then reads the ambient
+	temperature register once to tell the cause from the TA alert bits, and in interrupt mode sets the
+	Interrupt Clear bit so the output can fire again. subscribe() runs the callbacks on a thread for
+	every alert."""
+
+	def __init__(self, sensor, pin, interrupt=None):
+		"""interrupt tells if the sensor is in interrupt mode, when None it is read from the config
+		register"""
+		self._logger = logging.getLogger('MCP9808')
+		self.sensor = sensor
+		self.pin = pin
+		if interrupt is None:
+			interrupt = bool(sensor.getConfigReg() & MCP9808_REG_CONFIG_ALERTMODE)
+		self.interrupt = interrupt
+		self._callbacks = []
+		self._thread = None
+		self._stop = threading.Event()
+
+	def wait(self, timeout=None):
+		"""Wait for an alert, returns the MCP9808Reading taken after the edge, its crit, upper and lower
+		flags give the cause, or None if there was no alert before timeout seconds"""
+		if self.pin.wait(timeout) is None:
+			return None
+		# Always from the device, a coalesced value can predate the conversion that raised the alert
+		timestamp = _monotonic()
+		reading = MCP9808Reading(self.sensor._device.readU16BE(MCP9808_REG_AMBIENT_TEMP), timestamp)
+		if self.interrupt:
+			self.sensor.setIntClr()
+		return reading
+
+	def subscribe(self, callback):
+		"""Call callback(reading) on every alert, the first subscription starts the waiting thread"""
+		self._callbacks.append(callback)
+		if self._thread is None:
+			self._stop.clear()
+			self._thread = threading.Thread(target=self._run, name='MCP9808Alert')
+			self._thread.daemon = True
+			self._thread.start()
+
+	def unsubscribe(self, callback):
+		"""Stop calling callback, the thread stops with the last subscription"""
+		self._callbacks.remove(callback)
+		if not self._callbacks:
+			self.stop()
+
+	def stop(self, timeout=None):
+		"""Stop the waiting thread"""
+		self._stop.set()
+		if self._thread is not None and self._thread is not threading.current_thread():
+			self._thread.join(timeout)
+		self._thread = None
+
+	def _run(self):
+		while not self._stop.is_set():
+			try:
+				reading = self.wait(0.1)
+			except (IOError, OSError) as e:
+				if e.errno == errno.EINTR:
+					continue
+				self._logger.debug('Error waiting for the alert: {0}'.format(e))
+				self._stop.wait(0.1)
+				continue
+			if reading is None:
+				continue
+			for callback in list(self._callbacks):
+				try:
+					callback(reading)
+				except Exception:
+					self._logger.exception('Error in the alert callback')
+
+	def close(self):
+		"""Stop the thread and close the pin"""
+		self.stop()
+		self.pin.close()
@@ -0,0 +1,321 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Daemon serving the sensors to other processes over a UNIX or TCP socket, so only the daemon uses
+the bus:
+
+	python -m MCP9808.daemon --unix /run/mcp9808.sock --bus 1
+
+The protocol is JSON lines, every request is an object with an id that is repeated in the responses,
+the sensor is chosen with bus and address (0x18 by default, bus can be left out when the address is
+only used on one bus). The requests of a connection are served concurrently:
+
+	{"id": 1, "op": "sensors"}
+	{"id": 1, "result": [[1, 24], [1, 25]]}
+
+	{"id": 2, "op": "read", "address": 24}
+	{"id": 2, "result": {"raw": 49656, "timestamp": 1021.5, "tempC": 31.5, "alert": 6, ...}}
+
+	{"id": 3, "op": "call", "address": 24, "method": "setUpperTemp", "args": [30.0]}
+	{"id": 4, "op": "configure", "address": 24, "bits": {"alert_ctrl": true, "hysteresis": 1.5}}
+
+	{"id": 5, "op": "subscribe", "address": 24}
+	{"id": 5, "reading": {"raw": 49656, ...}}
+	{"id": 6, "op": "unsubscribe", "subscription": 5}
+
+Errors are answered with {"id": ..., "error": "message"}. The lock bits can only be cleared by a power
+cycle, call cannot run setCritLock() or setWinLock() and configure cannot set crit_lock, win_lock or
+the raw value. Identical read requests that arrive while
+one is in progress share its bus transaction, the bus transactions run on the executor of their bus
+(see MCP9808.aio) so they never overlap on a bus. A subscription receives every reading of a single
+poll of the sensor shared by all the subscribers, at the conversion rate unless a period is given.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from MCP9808.aio import AsyncMCP9808, getBusExecutor
+from MCP9808.manager import MCP9808Manager, MCP9808_I2CADDRS
+from MCP9808.mcp9808 import MCP9808_I2CADDR_DEFAULT, MCP9808Reading, MCP9808Snapshot
+from MCP9808.schedule import Schedule
+
+# Methods without side effects, identical concurrent calls of these are coalesced.
+_READ_METHODS                  = frozenset(('begin', 'read', 'readTempC', 'readTempRaw', 'getAlertOutput',
+	'getConfigReg', 'getResolution', 'getUpperTemp', 'getLowerTemp', 'getCritTemp', 'isLock', 'conversionTime',
+	'resolutionStep', 'snapshot'))
+
+# Methods that change the sensor a client can call. The lock bits can only be cleared by a power
+# cycle, setCritLock() and setWinLock() are left out on purpose.
+_WRITE_METHODS                 = frozenset(('readOneShot', 'clearConfigReg', 'setTempHyst', 'setShutdown',
+	'clearShutdown', 'setIntClr', 'clearIntClr', 'setAlertStat', 'clearAlertStat', 'setAlertCtrl', 'clearAlertCtrl',
+	'setAlertSel', 'clearAlertSel', 'setAlertPol', 'clearAlertPol', 'setAlertMode', 'clearAlertMode',
+	'setResolution', 'setUpperTemp', 'setLowerTemp', 'setCritTemp'))
+
+# MCP9808Config attributes the configure op can set, the lock bits and the raw value are left out for
+# the same reason.
+_CONFIG_BITS                   = frozenset(('hysteresis', 'shutdown', 'int_clr', 'alert_stat', 'alert_ctrl',
+	'alert_sel', 'alert_pol', 'alert_mode'))
+
+# Readings a slow subscriber can fall behind before the oldest ones are dropped.
+_SUBSCRIBER_QUEUE              = 16
+
+
+def _encode(result):
+	# JSON representation of a MCP9808 method result
+	if isinstance(result, MCP9808Reading):
+		return {'raw': result.raw, 'timestamp': result.timestamp, 'tempC': result.tempC, 'alert': result.alert,
+			'crit': result.crit, 'upper': result.upper, 'lower': result.lower}
+	if isinstance(result, MCP9808Snapshot):
+		return result.toDict()
+	return result
+
+
+class _Feed(object):
+	# Single poll of a sensor shared by the subscribers with the same period
+
+	def __init__(self, sensor, period):
+		self.sensor = sensor
+		self.period = period
+		self.queues = set()
+		self.task = None
+
+	async def run(self):
+		loop = asyncio.get_running_loop()
+		schedule = Schedule(clock=loop.time)
+		while self.queues:
+			try:
+				reading = _encode(await self.sensor.read())
+			except IOError as e:
+				reading = None
+				error = str(e)
+			for queue in self.queues:
+				if queue.full():
+					queue.get_nowait()
+				queue.put_nowait(reading if reading is not None else {'error': error})
+			# The conversion time follows resolution changes made while subscribed
+			period = self.period if self.period is not None else await self.sensor.conversionTime()
+			await asyncio.sleep(schedule.advance(period))
+
+
+class MCP9808Daemon(object):
+	"""Serve the sensors of a MCP9808Manager, discover() must have been called or the sensors added"""
+
+	def __init__(self, manager):
+		self._logger = logging.getLogger('MCP9808')
+		self.manager = manager
+		self.sensors = {}
+		for busnum, sensors in manager.sensors.items():
+			for address, sensor in sensors:
+				self.sensors[(busnum, address)] = AsyncMCP9808(sensor=sensor, executor=getBusExecutor(busnum))
+		self._inflight = {}
+		self._feeds = {}
+		self._server = None
+
+	def _sensor(self, request):
+		address = request.get('address', MCP9808_I2CADDR_DEFAULT)
+		busnum = request.get('bus')
+		if busnum is None:
+			keys = [key for key in self.sensors if key[1] == address]
+			if not keys:
+				raise KeyError('No sensor {0:#04X}'.format(address))
+			if len(keys) > 1:
+				raise KeyError('Address {0:#04X} is on {1} buses, the bus is needed'.format(address, len(keys)))
+			return keys[0], self.sensors[keys[0]]
+		key = (busnum, address)
+		if key not in self.sensors:
+			raise KeyError('No sensor {0:#04X} on bus {1}'.format(address, busnum))
+		return key, self.sensors[key]
+
+	async def call(self, key, method, args=()):
+		"""Call a MCP9808 method of the sensor key = (busnum, address) and return its result encoded for
+		JSON, only the reading, threshold and config bit methods can be called. Concurrent calls of the
+		same read method with the same arguments share one call"""
+		if method not in _READ_METHODS and method not in _WRITE_METHODS:
+			raise AttributeError('Method {0} cannot be called'.format(method))
+		sensor = self.sensors[key]
+		if method not in _READ_METHODS:
+			return _encode(await sensor.run(method, *args))
+		request = (key, method, tuple(args))
+		future = self._inflight.get(request)
+		if future is None:
+			future = asyncio.ensure_future(sensor.run(method, *args))
+			self._inflight[request] = future
+			future.add_done_callback(lambda f: self._inflight.pop(request, None))
+		return _encode(await asyncio.shield(future))
+
+	async def _subscribe(self, key, period, send, id):
+		feed = self._feeds.get((key, period))
+		if feed is None:
+			feed = self._feeds[(key, period)] = _Feed(self.sensors[key], period)
+		queue = asyncio.Queue(_SUBSCRIBER_QUEUE)
+		feed.queues.add(queue)
+		if feed.task is None or feed.task.done():
+			feed.task = asyncio.ensure_future(feed.run())
+		try:
+			while True:
+				reading = await queue.get()
+				if 'error' in reading:
+					await send({'id': id, 'error': reading['error']})
+				else:
+					await send({'id': id, 'reading': reading})
+		finally:
+			feed.queues.discard(queue)
+			if not feed.queues:
+				self._feeds.pop((key, period), None)
+
+	async def handle(self, request, send, subscriptions):
+		"""Serve one request, send(message) writes a response"""
+		id = request.get('id')
+		op = request.get('op')
+		try:
+			if op == 'sensors':
+				result = sorted(list(key) for key in self.sensors)
+			elif op == 'read':
+				key, sensor = self._sensor(request)
+				result = await self.call(key, 'read')
+			elif op == 'call':
+				key, sensor = self._sensor(request)
+				result = await self.call(key, request['method'], request.get('args', ()))
+			elif op == 'configure':
+				key, sensor = self._sensor(request)
+				bits = request.get('bits', {})
+				if not isinstance(bits, dict):
+					raise ValueError('bits is not an object')
+				for name in bits:
+					if name not in _CONFIG_BITS:
+						raise AttributeError('Config bit {0} cannot be set'.format(name))
+				result = await sensor.configure(clear=request.get('clear', False), verify=request.get('verify', False),
+					**bits)
+			elif op == 'subscribe':
+				key, sensor = self._sensor(request)
+				if id in subscriptions:
+					raise ValueError('Subscription {0} already exists'.format(id))
+				subscriptions[id] = asyncio.current_task()
+				try:
+					await self._subscribe(key, request.get('period'), send, id)
+				finally:
+					subscriptions.pop(id, None)
+				return
+			elif op == 'unsubscribe':
+				task = subscriptions.pop(request.get('subscription'), None)
+				if task is None:
+					raise KeyError('No subscription {0}'.format(request.get('subscription')))
+				task.cancel()
+				result = True
+			else:
+				raise ValueError('Unknown op {0}'.format(op))
+			response = json.dumps({'id': id, 'result': result})
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			self._logger.debug('Error serving {0}: {1}'.format(request, e))
+			await send({'id': id, 'error': '{0}: {1}'.format(type(e).__name__, e)})
+			return
+		await send(response)
+
+	async def _client(self, reader, writer):
+		lock = asyncio.Lock()
+		subscriptions = {}
+		tasks = set()
+
+		async def send(message):
+			# message is an object or an already encoded JSON line
+			if not isinstance(message, str):
+				message = json.dumps(message)
+			async with lock:
+				writer.write(message.encode('utf-8') + b'\n')
+				await writer.drain()
+
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+				try:
+					request = json.loads(line.decode('utf-8'))
+					if not isinstance(request, dict):
+						raise ValueError('The request is not an object')
+				except ValueError as e:
+					await send({'id': None, 'error': 'Bad request: {0}'.format(e)})
+					continue
+				task = asyncio.ensure_future(self.handle(request, send, subscriptions))
+				tasks.add(task)
+				task.add_done_callback(tasks.discard)
+		except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+			# Client gone or daemon stopping
+			pass
+		finally:
+			for task in list(tasks):
+				task.cancel()
+			writer.close()
+
+	async def start(self, path=None, host=None, port=None):
+		"""Listen on the UNIX socket path, or on host and port"""
+		if path is not None:
+			if os.path.exists(path):
+				os.unlink(path)
+			self._server = await asyncio.start_unix_server(self._client, path)
+		else:
+			self._server = await asyncio.start_server(self._client, host, port)
+		return self._server
+
+	async def close(self):
+		if self._server is not None:
+			self._server.close()
+			await self._server.wait_closed()
+			self._server = None
+		for feed in list(self._feeds.values()):
+			if feed.task is not None:
+				feed.task.cancel()
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Serve MCP9808 sensors over a socket with a JSON lines protocol')
+	parser.add_argument('--unix', metavar='PATH', help='UNIX socket path')
+	parser.add_argument('--host', default='127.0.0.1', help='TCP address when there is no UNIX socket')
+	parser.add_argument('--port', type=int, default=9808, help='TCP port when there is no UNIX socket')
+	parser.add_argument('--bus', type=int, action='append', help='I2C bus number, can be repeated, 1 by default')
+	parser.add_argument('--address', type=lambda value: int(value, 0), action='append',
+		help='sensor address, can be repeated, every MCP9808 address by default')
+	parser.add_argument('--debug', action='store_true', help='log the errors of every request')
+	args = parser.parse_args(argv)
+	logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+	manager = MCP9808Manager(buses=args.bus or (1,), addresses=args.address or MCP9808_I2CADDRS)
+	found = manager.discover()
+	logging.getLogger('MCP9808').info('Serving {0} sensors'.format(found))
+	daemon = MCP9808Daemon(manager)
+
+	loop = asyncio.new_event_loop()
+	asyncio.set_event_loop(loop)
+	loop.run_until_complete(daemon.start(args.unix, args.host, args.port))
+	try:
+		loop.run_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		loop.run_until_complete(daemon.close())
+		manager.close()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,213 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""I2C backend using the Linux i2c-dev interface directly, without Adafruit_GPIO. Every bus is opened
+once and every register access is a single I2C_RDWR ioctl, the register address write and the data
+read are sent with a repeated start. I2CBus.readWords() reads a register of several devices of the
+bus with one ioctl, MCP9808Manager.poll() uses it when all the sensors of a bus use this backend:
+
+	import MCP9808.i2cdev as i2cdev
+	import MCP9808.mcp9808 as MCP9808
+
+	sensor = MCP9808.MCP9808(i2c=i2cdev, busnum=1)
+
+It has the get_i2c_device() and reverseByteOrder() functions MCP9808 uses from Adafruit_GPIO.I2C,
+LinuxI2C does the same with an injected ioctl function and device path, for instance
+simulator.SimulatedI2CDevIoctl to run without an I2C adapter.
+"""
+import ctypes
+import fcntl
+import os
+import struct
+import threading
+
+from MCP9808.mcp9808 import reverseByteOrder
+
+# Linux i2c-dev ABI, see include/uapi/linux/i2c-dev.h and include/uapi/linux/i2c.h.
+I2C_RDWR                       = 0x0707
+I2C_M_RD                       = 0x0001
+I2C_RDWR_IOCTL_MAX_MSGS        = 42
+
+# Default bus of get_i2c_device(), the one of the Raspberry Pi header.
+I2CDEV_DEFAULT_BUS             = 1
+
+# struct i2c_msg and struct i2c_rdwr_ioctl_data, native alignment.
+_msg = struct.Struct('@HHHP')
+_rdwr = struct.Struct('@PI0P')
+
+
+class I2CBus(object):
+	"""File descriptor of an I2C adapter kept open for every device of the bus"""
+
+	def __init__(self, busnum, path='/dev/i2c-{0}', ioctl=fcntl.ioctl):
+		self.busnum = busnum
+		self._ioctl = ioctl
+		self._fd = os.open(path.format(busnum), os.O_RDWR)
+		self._lock = threading.Lock()
+		# Buffers of the single register accesses, reused under the lock
+		self._msgs = ctypes.create_string_buffer(_msg.size * 2)
+		self._out = ctypes.create_string_buffer(3)
+		self._in = ctypes.create_string_buffer(2)
+		self._args = {}
+
+	def fileno(self):
+		return self._fd
+
+	def close(self):
+		if self._fd is not None:
+			os.close(self._fd)
+			self._fd = None
+
+	def _transfer(self, msgs, count):
+		if self._fd is None:
+			raise ValueError('The bus is closed')
+		self._ioctl(self._fd, I2C_RDWR, _rdwr.pack(ctypes.addressof(msgs), count))
+
+	def readRegister(self, address, register, length):
+		"""Write the register address then read length bytes with a repeated start, returns bytes"""
+		with self._lock:
+			self._out[0] = register
+			_msg.pack_into(self._msgs, 0, address, 0, 1, ctypes.addressof(self._out))
+			_msg.pack_into(self._msgs, _msg.size, address, I2C_M_RD, length, ctypes.addressof(self._in))
+			self._transfer(self._msgs, 2)
+			return self._in.raw[:length]
+
+	def writeRegister(self, address, register, data):
+		"""Write the register address followed by the data bytes"""
+		with self._lock:
+			self._out[0] = register
+			for i, value in enumerate(bytearray(data)):
+				self._out[i + 1] = value
+			_msg.pack_into(self._msgs, 0, address, 0, len(data) + 1, ctypes.addressof(self._out))
+			self._transfer(self._msgs, 1)
+
+	def _words(self, count):
+		# Message, register and data buffers of a batch of count devices
+		args = self._args.get(count)
+		if args is None:
+			args = self._args[count] = (ctypes.create_string_buffer(_msg.size * 2 * count),
+				ctypes.create_string_buffer(1), ctypes.create_string_buffer(2 * count))
+		return args
+
+	def readWords(self, addresses, register):
+		"""Read the big endian 16 bit register of every address with one ioctl per 21 devices, returns a
+		list with the value of every address. If a device does not answer the addresses are read one by
+		one and the value of the failed ones is None"""
+		addresses = list(addresses)
+		values = []
+		batch = I2C_RDWR_IOCTL_MAX_MSGS // 2
+		for start in range(0, len(addresses), batch):
+			chunk = addresses[start:start + batch]
+			try:
+				values.extend(self._readWords(chunk, register))
+			except IOError:
+				for address in chunk:
+					try:
+						data = self.readRegister(address, register, 2)
+						values.append(struct.unpack('>H', data)[0])
+					except IOError:
+						values.append(None)
+		return values
+
+	def _readWords(self, addresses, register):
+		count = len(addresses)
+		with self._lock:
+			msgs, out, data = self._words(count)
+			out[0] = register
+			base = ctypes.addressof(data)
+			for i, address in enumerate(addresses):
+				_msg.pack_into(msgs, 2 * i * _msg.size, address, 0, 1, ctypes.addressof(out))
+				_msg.pack_into(msgs, (2 * i + 1) * _msg.size, address, I2C_M_RD, 2, base + 2 * i)
+			self._transfer(msgs, 2 * count)
+			return list(struct.unpack('>{0}H'.format(count), data.raw[:2 * count]))
+
+
+class I2CDevice(object):
+	"""Device of an I2CBus with the register methods of Adafruit_GPIO.I2C.Device used by MCP9808"""
+
+	def __init__(self, address, bus):
+		self._address = address
+		self.bus = bus
+
+	def readU8(self, register):
+		"""Read an unsigned byte from the register"""
+		return bytearray(self.bus.readRegister(self._address, register, 1))[0]
+
+	def readU16BE(self, register):
+		"""Read an unsigned big endian 16 bit value from the register"""
+		return struct.unpack('>H', self.bus.readRegister(self._address, register, 2))[0]
+
+	def write8(self, register, value):
+		"""Write a byte to the register"""
+		self.bus.writeRegister(self._address, register, bytearray((value & 0xFF,)))
+
+	def write16(self, register, value):
+		"""Write a 16 bit value to the register, the low byte first like the SMBus write word"""
+		self.bus.writeRegister(self._address, register, bytearray((value & 0xFF, (value >> 8) & 0xFF)))
+
+
+class LinuxI2C(object):
+	"""Open buses of an i2c-dev backend, it is passed to MCP9808 as i2c. The ioctl argument replaces
+	fcntl.ioctl and path is the device file of a bus number, it allows to run without an I2C adapter."""
+
+	def __init__(self, ioctl=fcntl.ioctl, path='/dev/i2c-{0}', default_bus=I2CDEV_DEFAULT_BUS):
+		self._ioctl = ioctl
+		self._path = path
+		self.default_bus = default_bus
+		self.buses = {}
+		self._lock = threading.Lock()
+
+	def getBus(self, busnum=None):
+		"""Return the I2CBus of a bus number, it is opened on first use"""
+		if busnum is None:
+			busnum = self.default_bus
+		with self._lock:
+			bus = self.buses.get(busnum)
+			if bus is None:
+				bus = self.buses[busnum] = I2CBus(busnum, self._path, self._ioctl)
+			return bus
+
+	def get_i2c_device(self, address, busnum=None, i2c_interface=None, **kwargs):
+		"""Return an I2CDevice for the address on the bus"""
+		return I2CDevice(address, self.getBus(busnum))
+
+	def reverseByteOrder(self, data):
+		return reverseByteOrder(data)
+
+	def close(self):
+		"""Close every bus"""
+		with self._lock:
+			for bus in self.buses.values():
+				bus.close()
+			self.buses.clear()
+
+
+# Backend of the module level get_i2c_device(), created on first use.
+_default = None
+_defaultLock = threading.Lock()
+
+
+def get_i2c_device(address, busnum=None, i2c_interface=None, **kwargs):
+	"""Return an I2CDevice for the address on the bus, the buses are shared by every device"""
+	global _default
+	with _defaultLock:
+		if _default is None:
+			_default = LinuxI2C()
+	return _default.get_i2c_device(address, busnum, i2c_interface, **kwargs)
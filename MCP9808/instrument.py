@@ -0,0 +1,161 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Bus transaction statistics, enabled per sensor with MCP9808.instrument(). While it is disabled the
+sensor talks to the device handle directly so there is no overhead at all:
+
+	sensor.instrument()
+	sensor.readTempC()
+	print(sensor.stats())
+	print(toPrometheus(sensor.instrument()))
+"""
+import bisect
+import threading
+import time
+
+_perf_counter = getattr(time, 'perf_counter', time.time)
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket has no bound.
+I2C_LATENCY_BUCKETS            = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                                  0.01, 0.025, 0.05, 0.1)
+
+
+class I2CStats(object):
+	"""Counters of the bus transactions of one or more devices, per operation (read16, read8, write16,
+	write8) and register: number of transactions, errors, total time and a latency histogram. The labels
+	are added to every sample of the Prometheus export.
+	"""
+
+	def __init__(self, labels=None, buckets=I2C_LATENCY_BUCKETS):
+		self.labels = dict(labels or {})
+		self.buckets = tuple(buckets)
+		self._lock = threading.Lock()
+		self._series = {}
+
+	def record(self, operation, register, seconds, error=False):
+		"""Account one transaction"""
+		key = (operation, register)
+		with self._lock:
+			series = self._series.get(key)
+			if series is None:
+				# [count, errors, seconds, histogram]
+				series = self._series[key] = [0, 0, 0.0, [0] * (len(self.buckets) + 1)]
+			series[0] += 1
+			if error:
+				series[1] += 1
+			series[2] += seconds
+			series[3][bisect.bisect_left(self.buckets, seconds)] += 1
+
+	def reset(self):
+		"""Clear every counter"""
+		with self._lock:
+			self._series.clear()
+
+	def snapshot(self):
+		"""Return a copy of the counters:
+
+			{'transactions': n, 'errors': n, 'seconds': s,
+			 'operations': {(operation, register): {'count': n, 'errors': n, 'seconds': s,
+			                                       'histogram': [n, ...]}}}
+
+		histogram[i] counts the transactions that took at most buckets[i] seconds and more than the
+		previous bound, the last item counts the rest."""
+		with self._lock:
+			operations = dict((key, {'count': s[0], 'errors': s[1], 'seconds': s[2], 'histogram': list(s[3])})
+				for key, s in self._series.items())
+		return {
+			'transactions': sum(s['count'] for s in operations.values()),
+			'errors': sum(s['errors'] for s in operations.values()),
+			'seconds': sum(s['seconds'] for s in operations.values()),
+			'operations': operations,
+		}
+
+
+class InstrumentedDevice(object):
+	"""Wrapper of an Adafruit_GPIO.I2C.Device compatible handle that records every transaction in an
+	I2CStats"""
+
+	def __init__(self, device, stats):
+		self.device = device
+		self.stats = stats
+
+	def _call(self, operation, method, register, *args):
+		start = _perf_counter()
+		try:
+			result = method(register, *args)
+		except Exception:
+			self.stats.record(operation, register, _perf_counter() - start, error=True)
+			raise
+		self.stats.record(operation, register, _perf_counter() - start)
+		return result
+
+	def readU16BE(self, register):
+		return self._call('read16', self.device.readU16BE, register)
+
+	def readU8(self, register):
+		return self._call('read8', self.device.readU8, register)
+
+	def write16(self, register, value):
+		return self._call('write16', self.device.write16, register, value)
+
+	def write8(self, register, value):
+		return self._call('write8', self.device.write8, register, value)
+
+	def __getattr__(self, name):
+		return getattr(self.device, name)
+
+
+def _labels(labels):
+	return ','.join('{0}="{1}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+		for k, v in sorted(labels.items()))
+
+
+def _bound(bound):
+	return repr(float(bound))
+
+
+def toPrometheus(*stats):
+	"""Return the counters of one or more I2CStats in the Prometheus text exposition format"""
+	lines = [
+		'# HELP mcp9808_i2c_transactions_total I2C transactions issued by the MCP9808 driver.',
+		'# TYPE mcp9808_i2c_transactions_total counter',
+	]
+	errors = [
+		'# HELP mcp9808_i2c_errors_total I2C transactions that failed.',
+		'# TYPE mcp9808_i2c_errors_total counter',
+	]
+	histogram = [
+		'# HELP mcp9808_i2c_transaction_seconds I2C transaction latency.',
+		'# TYPE mcp9808_i2c_transaction_seconds histogram',
+	]
+	for s in stats:
+		for (operation, register), series in sorted(s.snapshot()['operations'].items()):
+			labels = dict(s.labels, operation=operation, register='0x{0:02X}'.format(register))
+			text = _labels(labels)
+			lines.append('mcp9808_i2c_transactions_total{{{0}}} {1}'.format(text, series['count']))
+			errors.append('mcp9808_i2c_errors_total{{{0}}} {1}'.format(text, series['errors']))
+			cumulative = 0
+			for bound, n in zip(s.buckets + ('+Inf',), series['histogram']):
+				cumulative += n
+				le = bound if bound == '+Inf' else _bound(bound)
+				histogram.append('mcp9808_i2c_transaction_seconds_bucket{{{0}}} {1}'.format(_labels(dict(labels, le=le)), cumulative))
+			histogram.append('mcp9808_i2c_transaction_seconds_sum{{{0}}} {1!r}'.format(text, series['seconds']))
+			histogram.append('mcp9808_i2c_transaction_seconds_count{{{0}}} {1}'.format(text, series['count']))
+	return '\n'.join(lines + errors + histogram) + '\n'
@@ -0,0 +1,182 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Manage every MCP9808 on one or more I2C buses:
+
+	from MCP9808.manager import MCP9808Manager
+
+	with MCP9808Manager(buses=(1, 2)) as manager:
+		manager.discover()
+		for (busnum, address), reading in manager.poll().items():
+			print(busnum, address, reading.tempC)
+"""
+import logging
+import threading
+
+from MCP9808.mcp9808 import MCP9808, MCP9808Reading, MCP9808_REG_AMBIENT_TEMP, _monotonic
+
+# Addresses the MCP9808 can be strapped to with the A0-A2 pins.
+MCP9808_I2CADDRS               = tuple(range(0x18, 0x20))
+
+
+class MCP9808Manager(object):
+	"""Group of MCP9808 sensors on several I2C buses. Every bus has a lock that serializes the access
+	to its sensors, the sensors of a bus are polled one after the other and the buses are polled in
+	parallel on a thread pool with a worker per bus, or on a thread per bus and call when
+	concurrent.futures is missing (Python 2 without the futures backport). With the MCP9808.i2cdev
+	backend the sensors of a bus are read with a single I2C transfer.
+	"""
+
+	def __init__(self, buses=(1,), addresses=MCP9808_I2CADDRS, i2c=None, **kwargs):
+		"""Extra keyword arguments are passed to every MCP9808 created"""
+		self._logger = logging.getLogger('MCP9808')
+		self.buses = tuple(buses)
+		self.addresses = tuple(addresses)
+		self._i2c = i2c
+		self._kwargs = kwargs
+		self._locks = dict((busnum, threading.Lock()) for busnum in self.buses)
+		# Sensors found on every bus, sorted by address
+		self.sensors = dict((busnum, []) for busnum in self.buses)
+		self._executor = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+		return False
+
+	def __len__(self):
+		return sum(len(sensors) for sensors in self.sensors.values())
+
+	def lock(self, busnum):
+		"""Return the lock of a bus, hold it to use a sensor of the bus outside of the manager"""
+		return self._locks[busnum]
+
+	def close(self):
+		"""Stop the thread pool"""
+		if self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
+
+	def _map(self, function):
+		# Run function for every bus in parallel and return {busnum: result}
+		if len(self.buses) == 1:
+			return {self.buses[0]: function(self.buses[0])}
+		if self._executor is None:
+			try:
+				from concurrent.futures import ThreadPoolExecutor
+			except ImportError:
+				return self._mapThreads(function)
+			self._executor = ThreadPoolExecutor(max_workers=len(self.buses))
+		return dict(zip(self.buses, self._executor.map(function, self.buses)))
+
+	def _mapThreads(self, function):
+		# _map() without concurrent.futures, a thread per bus, the first error is raised again
+		results = {}
+		errors = []
+		def run(busnum):
+			try:
+				results[busnum] = function(busnum)
+			except Exception as e:
+				errors.append(e)
+		threads = [threading.Thread(target=run, args=(busnum,)) for busnum in self.buses]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		if errors:
+			raise errors[0]
+		return results
+
+	def _probe(self, busnum):
+		found = []
+		with self._locks[busnum]:
+			for address in self.addresses:
+				try:
+					sensor = MCP9808(address=address, i2c=self._i2c, busnum=busnum, **self._kwargs)
+					if sensor.begin():
+						found.append((address, sensor))
+				except IOError:
+					# Nothing acknowledged on this address
+					continue
+		self._logger.debug('Found {0} sensors on bus {1}'.format(len(found), busnum))
+		return found
+
+	def discover(self):
+		"""Probe every address of every bus with the begin() ID check, returns the number of sensors found"""
+		for busnum, found in self._map(self._probe).items():
+			self.sensors[busnum] = found
+		return len(self)
+
+	def add(self, busnum, address, sensor=None):
+		"""Add a sensor without probing it, returns the sensor"""
+		if sensor is None:
+			sensor = MCP9808(address=address, i2c=self._i2c, busnum=busnum, **self._kwargs)
+		if busnum not in self._locks:
+			self.buses += (busnum,)
+			self._locks[busnum] = threading.Lock()
+			self.close()
+		sensors = [s for s in self.sensors.get(busnum, []) if s[0] != address]
+		sensors.append((address, sensor))
+		sensors.sort(key=lambda s: s[0])
+		self.sensors[busnum] = sensors
+		return sensor
+
+	def _pollBatch(self, busnum):
+		# Read every sensor of the bus with a single transfer when they share an i2cdev.I2CBus, the
+		# instrumented sensors are read one by one to keep their counters
+		sensors = self.sensors[busnum]
+		if not sensors or any(sensor._stats is not None for address, sensor in sensors):
+			return None
+		bus = getattr(sensors[0][1]._device, 'bus', None)
+		if not hasattr(bus, 'readWords') or any(getattr(sensor._device, 'bus', None) is not bus for address, sensor in sensors):
+			return None
+		timestamp = _monotonic()
+		words = bus.readWords([address for address, sensor in sensors], MCP9808_REG_AMBIENT_TEMP)
+		return [(address, None if raw is None else MCP9808Reading(raw, timestamp))
+			for (address, sensor), raw in zip(sensors, words)]
+
+	def _poll(self, busnum):
+		readings = []
+		with self._locks[busnum]:
+			batch = self._pollBatch(busnum)
+			if batch is not None:
+				return batch
+			for address, sensor in self.sensors[busnum]:
+				try:
+					readings.append((address, sensor.read()))
+				except IOError as e:
+					self._logger.debug('Error reading sensor {0:#04X} on bus {1}: {2}'.format(address, busnum, e))
+					readings.append((address, None))
+		return readings
+
+	def poll(self):
+		"""Read every sensor once and return {(busnum, address): MCP9808Reading}, the reading is None
+		for the sensors that failed"""
+		snapshot = {}
+		for busnum, readings in self._map(self._poll).items():
+			for address, reading in readings:
+				snapshot[(busnum, address)] = reading
+		return snapshot
+
+	def readTempC(self):
+		"""Read every sensor once and return {(busnum, address): temperature in degrees celsius}"""
+		return dict((key, None if reading is None else reading.tempC) for key, reading in self.poll().items())
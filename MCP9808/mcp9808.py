@@ -19,8 +19,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+from array import array
 import logging
 import math
+import struct
+import threading
+import time
+
+_monotonic = getattr(time, 'monotonic', time.time)
 
 # Default I2C address for device.
 MCP9808_I2CADDR_DEFAULT        = 0x18
@@ -33,7 +39,7 @@ MCP9808_REG_CRIT_TEMP          = 0x04
 MCP9808_REG_AMBIENT_TEMP       = 0x05
 MCP9808_REG_MANUF_ID           = 0x06
 MCP9808_REG_DEVICE_ID          = 0x07
-MCP9808_REG_RESOLUTION	       = 0x08
+MCP9808_REG_RESOLUTION         = 0x08
 
 # Configuration register values.
 MCP9808_REG_CONFIG_SHUTDOWN    = 0x0100
@@ -45,322 +51,716 @@ MCP9808_REG_CONFIG_ALERTCTRL   = 0x0008
 MCP9808_REG_CONFIG_ALERTSEL    = 0x0004
 MCP9808_REG_CONFIG_ALERTPOL    = 0x0002
 MCP9808_REG_CONFIG_ALERTMODE   = 0x0001
+MCP9808_REG_CONFIG_LOCKS       = MCP9808_REG_CONFIG_CRITLOCKED | MCP9808_REG_CONFIG_WINLOCKED
+MCP9808_REG_CONFIG_HYST        = 0x0600
+
+# Config register bits that are not stored, the alert status follows the alert output and the
+# interrupt clear bit always reads 0.
+MCP9808_REG_CONFIG_VOLATILE    = MCP9808_REG_CONFIG_ALERTSTAT | MCP9808_REG_CONFIG_INTCLR
+
+# Config register bits that can not be altered when a lock bit is set.
+MCP9808_REG_CONFIG_LOCKED_BY_ANY = MCP9808_REG_CONFIG_HYST | MCP9808_REG_CONFIG_ALERTCTRL
+MCP9808_REG_CONFIG_LOCKED_BY_WIN = MCP9808_REG_CONFIG_ALERTSEL
+
+# Temperature hysteresis values and their config register bits.
+MCP9808_HYST_BITS              = {0: 0x0000, 1.5: 0x0200, 3: 0x0400, 6: 0x0600}
+
+# Ambient temperature register alert bits.
+MCP9808_TA_CRIT                = 0x8000
+MCP9808_TA_UPPER               = 0x4000
+MCP9808_TA_LOWER               = 0x2000
+
+# Conversion time in seconds for every value of the Resolution register.
+MCP9808_CONVERSION_TIME        = (0.030, 0.065, 0.130, 0.250)
+
+# Temperature step in Celsius for every value of the Resolution register.
+MCP9808_RESOLUTION_STEP        = (0.5, 0.25, 0.125, 0.0625)
+
+# 16 bit registers kept in the shadow copy when the cache is enabled.
+MCP9808_SHADOW_REGS            = (MCP9808_REG_CONFIG, MCP9808_REG_UPPER_TEMP,
+                                  MCP9808_REG_LOWER_TEMP, MCP9808_REG_CRIT_TEMP)
+
+# Celsius value of every 13 bit temperature word, built on first use by decodeTemps.
+_TEMP_TABLE = None
+
+
+def _protectedConfigBits(locks, value):
+	"""Mask of the config register bits the device keeps when value is written with the lock bits locks
+	set, the Shutdown bit can still be cleared but not set"""
+	protected = 0
+	if locks:
+		protected |= MCP9808_REG_CONFIG_LOCKED_BY_ANY
+		if value & MCP9808_REG_CONFIG_SHUTDOWN:
+			protected |= MCP9808_REG_CONFIG_SHUTDOWN
+	if locks & MCP9808_REG_CONFIG_WINLOCKED:
+		protected |= MCP9808_REG_CONFIG_LOCKED_BY_WIN
+	return protected
+
+
+def reverseByteOrder(data):
+	"""Reverse the byte order of an integer, same behaviour as Adafruit_GPIO.I2C.reverseByteOrder"""
+	byteCount = len(hex(data)[2:].replace('L', '')[::2])
+	val = 0
+	for i in range(byteCount):
+		val = (val << 8) | (data & 0xFF)
+		data >>= 8
+	return val
+
+
+def decodeTemp(raw):
+	"""Convert a temperature register word to Celsius, the alert bits 13-15 are ignored"""
+	temp = (raw & 0x0FFF) / 16.0
+	if raw & 0x1000:
+		temp = -temp
+	return temp
+
+
+def encodeTemp(temp):
+	"""Convert a temperature in Celsius to the Upper, Lower and Critical register format, the value
+	is rounded by defect to 0.25 Celsius steps"""
+	new_temp = (int(math.floor(abs(temp) * 4)) << 2) & 0x0FFC
+	#Set Sign if it is negative
+	if temp < 0:
+		new_temp = new_temp | 0x1000
+	return new_temp
+
+
+def _tempTable():
+	global _TEMP_TABLE
+	if _TEMP_TABLE is None:
+		# A tuple of float objects, indexing it does not allocate a new float per word
+		_TEMP_TABLE = tuple([decodeTemp(raw) for raw in range(0x2000)])
+	return _TEMP_TABLE
+
+
+def decodeTemps(words):
+	"""Convert a sequence of raw temperature register words to Celsius. A NumPy array is decoded with
+	vectorized arithmetic and returns a float64 NumPy array, anything else is decoded with a lookup
+	table and returns an array('d')"""
+	if hasattr(words, 'dtype'):
+		import numpy
+		words = numpy.asarray(words).astype(numpy.int32)
+		temps = (words & 0x0FFF) / 16.0
+		return numpy.where(words & 0x1000, -temps, temps)
+	table = _tempTable()
+	return array('d', [table[raw & 0x1FFF] for raw in words])
+
+
+def encodeTemps(temps):
+	"""Convert a sequence of temperatures in Celsius to the Upper, Lower and Critical register format
+	with the same rounding as encodeTemp. A NumPy array returns a uint16 NumPy array, anything else
+	returns an array('H')"""
+	if hasattr(temps, 'dtype'):
+		import numpy
+		temps = numpy.asarray(temps, dtype=numpy.float64)
+		raw = (numpy.floor(numpy.abs(temps) * 4).astype(numpy.int64) << 2) & 0x0FFC
+		return (raw | numpy.where(temps < 0, 0x1000, 0)).astype(numpy.uint16)
+	return array('H', [encodeTemp(temp) for temp in temps])
+
+
+class MCP9808Reading(object):
+	"""Ambient temperature register sample returned by MCP9808.read(), it keeps the raw word and the
+	monotonic timestamp of the read, the temperature and the alert flags are decoded on access"""
+
+	__slots__ = ('raw', 'timestamp')
+
+	def __init__(self, raw, timestamp):
+		self.raw = raw
+		self.timestamp = timestamp
+
+	def __repr__(self):
+		return 'MCP9808Reading(raw=0x{0:04X}, timestamp={1!r})'.format(self.raw, self.timestamp)
+
+	@property
+	def tempC(self):
+		"""Temperature in degrees celsius"""
+		return decodeTemp(self.raw)
+
+	@property
+	def alert(self):
+		"""Bits 13, 14 and 15 of the TA register mapped into an int, same as MCP9808.getAlertOutput()"""
+		return (self.raw & 0xE000) >> 13
+
+	@property
+	def crit(self):
+		"""True if TA >= TCRIT"""
+		return bool(self.raw & MCP9808_TA_CRIT)
+
+	@property
+	def upper(self):
+		"""True if TA > TUPPER"""
+		return bool(self.raw & MCP9808_TA_UPPER)
+
+	@property
+	def lower(self):
+		"""True if TA < TLOWER"""
+		return bool(self.raw & MCP9808_TA_LOWER)
+
+
+class MCP9808Snapshot(object):
+	"""Values of the CONFIG, UPPER, LOWER, CRIT and RESOLUTION registers returned by MCP9808.snapshot(),
+	pack() and toDict() serialize it, unpack() and fromDict() build it back"""
+
+	__slots__ = ('config', 'upper', 'lower', 'crit', 'resolution')
+
+	# Big endian CONFIG, UPPER, LOWER, CRIT and RESOLUTION, 9 bytes.
+	_format = struct.Struct('>HHHHB')
+
+	def __init__(self, config=0x0000, upper=0x0000, lower=0x0000, crit=0x0000, resolution=0x03):
+		self.config = config
+		self.upper = upper
+		self.lower = lower
+		self.crit = crit
+		self.resolution = resolution
+
+	def __repr__(self):
+		return ('MCP9808Snapshot(config=0x{0:04X}, upper=0x{1:04X}, lower=0x{2:04X}, crit=0x{3:04X}, '
+			'resolution=0x{4:02X})').format(self.config, self.upper, self.lower, self.crit, self.resolution)
+
+	def __eq__(self, other):
+		return isinstance(other, MCP9808Snapshot) and self.toDict() == other.toDict()
+
+	def __ne__(self, other):
+		return not self == other
+
+	def registers(self):
+		"""Return {register address: value}"""
+		return {
+			MCP9808_REG_CONFIG: self.config,
+			MCP9808_REG_UPPER_TEMP: self.upper,
+			MCP9808_REG_LOWER_TEMP: self.lower,
+			MCP9808_REG_CRIT_TEMP: self.crit,
+			MCP9808_REG_RESOLUTION: self.resolution,
+		}
+
+	def toDict(self):
+		return dict((name, getattr(self, name)) for name in self.__slots__)
+
+	@classmethod
+	def fromDict(cls, values):
+		return cls(**values)
+
+	def pack(self):
+		return self._format.pack(self.config, self.upper, self.lower, self.crit, self.resolution)
+
+	@classmethod
+	def unpack(cls, data):
+		return cls(*cls._format.unpack(data))
+
+
+class _LazyDevice(object):
+	"""Stand in for the bus device until the first transaction, it opens the real device and the
+	sensor uses the real device directly from then on"""
+
+	def __init__(self, sensor):
+		self._sensor = sensor
+
+	def __getattr__(self, name):
+		return getattr(self._sensor._open(), name)
+
 
 class MCP9808(object):
 	"""Class to represent an Adafruit MCP9808 precision temperature measurement
 	board.
 	"""
 
-	def __init__(self, address=MCP9808_I2CADDR_DEFAULT, i2c=None, **kwargs):
+	def __init__(self, address=MCP9808_I2CADDR_DEFAULT, i2c=None, cache=False, coalesce=False, **kwargs):
 		"""Initialize MCP9808 device on the specified I2C address and bus number.
 		Address defaults to 0x18 and bus number defaults to the appropriate bus
-		for the hardware.
+		for the hardware. If cache is True the CONFIG, RESOLUTION and threshold
+		registers are kept in a write-through shadow copy, setters only issue the
+		write and getters are served from memory, use refresh() and invalidate()
+		to resynchronize the shadow copy with the device. If coalesce is True the
+		ambient temperature register is read at most once per conversion time of
+		the current resolution, calls inside that period get the same raw value
+		and concurrent callers share a single bus transaction. The Alert Status bit of
+		the config register is not cached, with the cache getConfigReg() reads it as 0
+		and the alert status needs a device read (getAlertOutput() or a sensor without
+		the cache). The bus is opened on
+		the first transaction, when i2c is None Adafruit_GPIO.I2C is imported then.
 		"""
 		self._logger = logging.getLogger('MCP9808')
-		if i2c is None:
-			import Adafruit_GPIO.I2C as I2C
-			self._i2c = I2C
-		self._device = self._i2c.get_i2c_device(address, **kwargs)
+		self._i2c = i2c
+		self._address = address
+		self._kwargs = kwargs
+		self._device = _LazyDevice(self)
+		self._verified = False
+		self._stats = None
+		self._cache = cache
+		self._shadow = {}
+		self._coalesce = coalesce
+		self._resolution = None
+		self._ambient = None
+		self._ambientLock = threading.Lock()
 
 
-	def begin(self):
+	def _open(self):
+		"""Return the bus device, it is created on the first call"""
+		device = self._device
+		if isinstance(device, _LazyDevice):
+			if self._i2c is None:
+				import Adafruit_GPIO.I2C as I2C
+				self._i2c = I2C
+			device = self._device = self._i2c.get_i2c_device(self._address, **self._kwargs)
+		return device
+
+	def _debug(self, message, *args):
+		# Only format the message when debug logging is enabled
+		if self._logger.isEnabledFor(logging.DEBUG):
+			self._logger.debug(message.format(*args))
+
+	def begin(self, verify=True):
 		"""Start taking temperature measurements. Returns True if the device is 
-		intialized, False otherwise.
+		intialized, False otherwise. The IDs are only read until they match once,
+		with verify=False they are not read at all.
 		"""
+		if self._verified or not verify:
+			return True
 		# Check manufacturer and device ID match expected values.
 		mid = self._device.readU16BE(MCP9808_REG_MANUF_ID)
 		did = self._device.readU16BE(MCP9808_REG_DEVICE_ID)
-		self._logger.debug('Read manufacturer ID: {0:#06X}'.format(mid))
-		self._logger.debug('Read device ID: {0:#06X}'.format(did))
-		return mid == 0x0054 and did == 0x0400
+		self._debug('Read manufacturer ID: {0:#06X}', mid)
+		self._debug('Read device ID: {0:#06X}', did)
+		self._verified = mid == 0x0054 and did == 0x0400
+		return self._verified
+
+	def instrument(self, stats=None):
+		"""Start recording every bus transaction of the sensor, returns the MCP9808.instrument.I2CStats
+		with the counters. Pass stats to share the counters with other sensors"""
+		if self._stats is not None:
+			return self._stats
+		from MCP9808.instrument import I2CStats, InstrumentedDevice
+		if stats is None:
+			stats = I2CStats({'address': '0x{0:02X}'.format(self._address)})
+		self._stats = stats
+		self._device = InstrumentedDevice(self._open(), stats)
+		return stats
+
+	def uninstrument(self):
+		"""Stop recording the bus transactions"""
+		if self._stats is not None:
+			self._device = self._device.device
+			self._stats = None
+
+	def stats(self):
+		"""Return a snapshot of the bus transaction counters, None if instrument() was not called"""
+		if self._stats is None:
+			return None
+		return self._stats.snapshot()
+
+	def snapshot(self):
+		"""Read the CONFIG, UPPER, LOWER, CRIT and RESOLUTION registers from the device and return them as
+		a MCP9808Snapshot, the alert status and interrupt clear bits are not kept"""
+		values = [self._device.readU16BE(register) for register in MCP9808_SHADOW_REGS]
+		resolution = self._device.readU8(MCP9808_REG_RESOLUTION)
+		values[0] &= ~MCP9808_REG_CONFIG_VOLATILE
+		if self._cache:
+			self._shadow.update(zip(MCP9808_SHADOW_REGS, values))
+			self._shadow[MCP9808_REG_RESOLUTION] = resolution
+		return MCP9808Snapshot(*(values + [resolution]))
+
+	def restore(self, snapshot):
+		"""Write the registers of a MCP9808Snapshot that differ from the device, the current values are read
+		first with snapshot(). Threshold registers protected by the Critical or Window lock bits are skipped,
+		the config register is written last so the lock bits of the snapshot do not block the thresholds.
+		Returns a list [a,b], a is the list of registers written and b the list of registers skipped"""
+		current = self.snapshot()
+		locks = current.config & MCP9808_REG_CONFIG_LOCKS
+		written = []
+		skipped = []
+		if snapshot.resolution != current.resolution:
+			self._writeResolution(snapshot.resolution)
+			self._resolution = snapshot.resolution & 0x03
+			self._ambient = None
+			written.append(MCP9808_REG_RESOLUTION)
+		for register, value, old, lock in (
+				(MCP9808_REG_UPPER_TEMP, snapshot.upper, current.upper, MCP9808_REG_CONFIG_WINLOCKED),
+				(MCP9808_REG_LOWER_TEMP, snapshot.lower, current.lower, MCP9808_REG_CONFIG_WINLOCKED),
+				(MCP9808_REG_CRIT_TEMP, snapshot.crit, current.crit, MCP9808_REG_CONFIG_CRITLOCKED)):
+			if value == old:
+				continue
+			if locks & lock:
+				skipped.append(register)
+				continue
+			self._write16(register, value)
+			written.append(register)
+		config = snapshot.config & ~MCP9808_REG_CONFIG_VOLATILE
+		# The lock bits can not be cleared and the bits they protect can not be altered
+		protected = _protectedConfigBits(locks, config)
+		config = (config & ~protected) | (current.config & protected) | locks
+		if config != current.config:
+			self._write16(MCP9808_REG_CONFIG, config)
+			written.append(MCP9808_REG_CONFIG)
+		if (snapshot.config ^ current.config) & protected:
+			# Partially restored, the protected bits were left as they are
+			skipped.append(MCP9808_REG_CONFIG)
+		self._debug('Registers restored: {0}, skipped: {1}', written, skipped)
+		return [written, skipped]
+
+	def refresh(self):
+		"""Reload the shadow copy of the CONFIG, threshold and RESOLUTION registers
+		from the device, the conversion time follows the resolution read"""
+		for register in MCP9808_SHADOW_REGS:
+			self._shadow[register] = self._device.readU16BE(register)
+		self._shadow[MCP9808_REG_CONFIG] &= ~MCP9808_REG_CONFIG_VOLATILE
+		resolution = self._shadow[MCP9808_REG_RESOLUTION] = self._device.readU8(MCP9808_REG_RESOLUTION)
+		self._resolution = resolution & 0x03
+
+	def invalidate(self):
+		"""Drop the shadow copy, the next access to every register will go to the device"""
+		self._shadow.clear()
+		self._resolution = None
+		self._ambient = None
+
+	def conversionTime(self):
+		"""Return the conversion time in seconds for the current resolution"""
+		if self._resolution is None:
+			self._resolution = self._readResolution() & 0x03
+		return MCP9808_CONVERSION_TIME[self._resolution]
+
+	def resolutionStep(self):
+		"""Return the temperature step in Celsius for the current resolution"""
+		if self._resolution is None:
+			self._resolution = self._readResolution() & 0x03
+		return MCP9808_RESOLUTION_STEP[self._resolution]
+
+	def _readAmbient(self):
+		"""Read the ambient temperature register, when coalesce is enabled a value read less than a
+		conversion time ago is returned and concurrent callers wait for the read in flight"""
+		if not self._coalesce:
+			return self._device.readU16BE(MCP9808_REG_AMBIENT_TEMP)
+		period = self.conversionTime()
+		ambient = self._ambient
+		if ambient is not None and _monotonic() - ambient[0] < period:
+			return ambient[1]
+		with self._ambientLock:
+			# Another caller may have read the register while this one was waiting
+			ambient = self._ambient
+			start = _monotonic()
+			if ambient is not None and start - ambient[0] < period:
+				return ambient[1]
+			t = self._device.readU16BE(MCP9808_REG_AMBIENT_TEMP)
+			self._ambient = (start, t)
+			return t
+
+	def _read16(self, register):
+		"""Read a 16 bit register, served from the shadow copy when the cache is enabled"""
+		if not self._cache:
+			return self._device.readU16BE(register)
+		value = self._shadow.get(register)
+		if value is None:
+			value = self._device.readU16BE(register)
+			if register == MCP9808_REG_CONFIG:
+				value &= ~MCP9808_REG_CONFIG_VOLATILE
+			self._shadow[register] = value
+		return value
 
-        def getConfigReg(self):
-		"""Returns the Config register value"""
+	def _write16(self, register, value):
+		"""Write a 16 bit register MSB first and keep the shadow copy up to date"""
+		# The SMBus word write sends the low byte first
+		self._device.write16(register, ((value & 0xFF) << 8) | ((value >> 8) & 0xFF))
+		if not self._cache:
+			return
+		config = self._shadow.get(MCP9808_REG_CONFIG)
+		if register == MCP9808_REG_CONFIG:
+			if config is None:
+				# The lock bits are unknown, let the next read fetch the real value
+				return
+			# The lock bits are sticky and the bits they protect keep their value, the alert status and
+			# interrupt clear bits are not stored
+			locks = config & MCP9808_REG_CONFIG_LOCKS
+			protected = _protectedConfigBits(locks, value)
+			value = ((value & ~protected) | (config & protected) | locks) & ~MCP9808_REG_CONFIG_VOLATILE
+		elif config is None:
+			# Cannot tell if the register is locked, drop it from the shadow copy
+			self._shadow.pop(register, None)
+			return
+		elif register == MCP9808_REG_CRIT_TEMP and config & MCP9808_REG_CONFIG_CRITLOCKED:
+			return
+		elif register != MCP9808_REG_CRIT_TEMP and config & MCP9808_REG_CONFIG_WINLOCKED:
+			return
+		self._shadow[register] = value
+
+	def _readResolution(self):
+		"""Read the 8 bit Resolution register, served from the shadow copy when the cache is enabled"""
+		if not self._cache:
+			return self._device.readU8(MCP9808_REG_RESOLUTION)
+		value = self._shadow.get(MCP9808_REG_RESOLUTION)
+		if value is None:
+			value = self._device.readU8(MCP9808_REG_RESOLUTION)
+			self._shadow[MCP9808_REG_RESOLUTION] = value
+		return value
+
+	def _writeResolution(self, value):
+		"""Write the 8 bit Resolution register and keep the shadow copy up to date"""
+		self._device.write8(MCP9808_REG_RESOLUTION, value)
+		if self._cache:
+			self._shadow[MCP9808_REG_RESOLUTION] = value
+
+	def configure(self, clear=False, verify=False):
+		"""Return a MCP9808Config to change several config register bits with a single write, use it
+		as a context manager, the new config register value is written when the block exits:
+
+			with sensor.configure() as cfg:
+				cfg.alert_ctrl = True
+				cfg.hysteresis = 1.5
+
+		If clear is True the changes start from 0x0000 instead of the current register value, saving the
+		read. If verify is True the register is read back once after the write."""
+		return MCP9808Config(self, clear=clear, verify=verify)
+
+	def getConfigReg(self):
+		"""Returns the Config register value, with the cache the Alert Status bit reads as 0"""
 		# Read Config Register value
-		return self._device.readU16BE(MCP9808_REG_CONFIG)
+		return self._read16(MCP9808_REG_CONFIG)
 
 	def clearConfigReg(self):
 		"""Clear the Config Register value"""
-		self._device.write16(MCP9808_REG_CONFIG, 0x0000)		
+		self._write16(MCP9808_REG_CONFIG, 0x0000)
 
 	def setTempHyst(self, thyst=0):
 		"""Set the Temperature hysteresis, the valid values are 0, +1.5, +3.0, +6.0 Celsius Degrees
 		if the thyst is not a valid then it will not make any modification to the register, this function
 		returns a list with [a,b], a is 1 if thyst was valid and 0 if it was not, b is the new value of the 
 		config register if it was successfull and if was not it returns an Error String"""
-		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
 		# Validate thyst
-		if thyst == 0:
-			t = 0x0000
-			new_config = (config & 0xF9FF) | t
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-			self._logger.debug('Temperature Hysteresis set: {0:#06X}'.format(new_config))
-			return [1, self._device.readU16BE(MCP9808_REG_CONFIG)]
-		elif thyst == 1.5:
-			t = 0x0200
-			new_config = (config & 0xF9FF) | t
-                        self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-                        self._logger.debug('Temperature Hysteresis set: {0:#06X}'.format(new_config))
-			return [1, self._device.readU16BE(MCP9808_REG_CONFIG)]
-		elif thyst == 3:
-			t = 0x0400
-			new_config = (config & 0xF9FF) | t
-                        self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-                        self._logger.debug('Temperature Hysteresis set: {0:#06X}'.format(new_config))
-			return [1, self._device.readU16BE(MCP9808_REG_CONFIG)]
-		elif thyst== 6:
-			t = 0x0600
-			new_config = (config & 0xF9FF) | t
-                        self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-                        self._logger.debug('Temperature Hysteresis set: {0:#06X}'.format(new_config))
-			return [1, self._device.readU16BE(MCP9808_REG_CONFIG)]
-		else:
-			return [0, 'Temperature Hysteresis is not valid, Valid Values are: 0, +1.5, +3, +6']
+		if thyst not in MCP9808_HYST_BITS:
 			self._logger.debug('Error setting the Temperature Hysteresis')
+			return [0, 'Temperature Hysteresis is not valid, Valid Values are: 0, +1.5, +3, +6']
+		# Read the config Register
+		config = self._read16(MCP9808_REG_CONFIG)
+		new_config = (config & ~MCP9808_REG_CONFIG_HYST) | MCP9808_HYST_BITS[thyst]
+		self._write16(MCP9808_REG_CONFIG, new_config)
+		self._debug('Temperature Hysteresis set: {0:#06X}', new_config)
+		return [1, self._read16(MCP9808_REG_CONFIG)]
 
 	def setShutdown(self):
 		"""Set shutdown bit on the config register"""
 		# Read the config Register
-        	config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Set the shutdown bit
-		self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(config | MCP9808_REG_CONFIG_SHUTDOWN))
-		self._logger.debug('The Shutdown set: {0:#06X}'.format(config | MCP9808_REG_CONFIG_SHUTDOWN))
+		self._write16(MCP9808_REG_CONFIG, config | MCP9808_REG_CONFIG_SHUTDOWN)
+		self._debug('The Shutdown set: {0:#06X}', config | MCP9808_REG_CONFIG_SHUTDOWN)
 
 	def clearShutdown(self):
 		"""Clear shutdown bit on the config register"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Clear the Shutdown bit
-		self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(config & ~MCP9808_REG_CONFIG_SHUTDOWN))
-		self._logger.debug('The Shutdown Clear: {0:#06X}'.format(config | ~MCP9808_REG_CONFIG_SHUTDOWN))
-    
-    	def setCritLock(self):
+		self._write16(MCP9808_REG_CONFIG, config & ~MCP9808_REG_CONFIG_SHUTDOWN)
+		self._debug('The Shutdown Clear: {0:#06X}', config & ~MCP9808_REG_CONFIG_SHUTDOWN)
+
+	def setCritLock(self):
 		"""Set Critical lock bit on the config register, be careful once set it can only be cleared by an internal power reset"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Set the CritLock bit
 		new_config = config | MCP9808_REG_CONFIG_CRITLOCKED
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
+		self._write16(MCP9808_REG_CONFIG, new_config)
 
 	def setWinLock(self):
 		"""Set Window lock bit on the config register, be careful once set it can only be cleared by an internal power reset"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Set the WinLock bit
 		new_config = config | MCP9808_REG_CONFIG_WINLOCKED
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-	
+		self._write16(MCP9808_REG_CONFIG, new_config)
+
 	def isLock(self):
 		"""Check if the lock bits are set"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG) & 0x00C0
+		config = self._read16(MCP9808_REG_CONFIG) & MCP9808_REG_CONFIG_LOCKS
 		if config == 0x00C0 or config == 0x0040 or config==0x0080:
 			return True
 		else:
 			return False
-	
+
 	def setIntClr(self):
 		"""Set Interrrupt Clear bit on the config register"""
 		# Read the config Register
-        	config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Set the Interrupt Clear bit
 		new_config = config | MCP9808_REG_CONFIG_INTCLR
-		self._logger.debug('Setting Interrupt Clear bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
+		self._debug('Setting Interrupt Clear bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
 
 	def clearIntClr(self):
 		"""Clear Interrupt Clear bit on the config register"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Clear the Interrupt Clear bit
 		new_config = config & ~MCP9808_REG_CONFIG_INTCLR
-		self._logger.debug('Clearing Interrupt Clear bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-	
+		self._debug('Clearing Interrupt Clear bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
+
 	def setAlertStat(self):
 		"""Set Alert Status bit on the config register"""
 		# Read the config Register
-        	config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Set the Alert Status bit
 		new_config = config | MCP9808_REG_CONFIG_ALERTSTAT
-		self._logger.debug('Setting Alert Status bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
+		self._debug('Setting Alert Status bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
 
 	def clearAlertStat(self):
 		"""Clear Alert Status bit on the config register"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Clear the Alert Status bit
 		new_config = config & ~MCP9808_REG_CONFIG_ALERTSTAT
-		self._logger.debug('Clearing Alert Status bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-	
+		self._debug('Clearing Alert Status bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
+
 	def setAlertCtrl(self):
 		"""Set Alert Control bit on the config register"""
 		# Read the config Register
-        	config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Set the Alert Control bit
 		new_config = config | MCP9808_REG_CONFIG_ALERTCTRL
-		self._logger.debug('Setting Alert Control bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
+		self._debug('Setting Alert Control bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
 
 	def clearAlertCtrl(self):
 		"""Clear Alert Control bit on the config register"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Clear the Alert Control bit
 		new_config = config & ~MCP9808_REG_CONFIG_ALERTCTRL
-		self._logger.debug('Clearing Alert Control bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-	
+		self._debug('Clearing Alert Control bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
+
 	def setAlertSel(self):
 		"""Set Alert Select bit on the config register"""
 		# Read the config Register
-        	config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Set the Alert Select bit
 		new_config = config | MCP9808_REG_CONFIG_ALERTSEL
-		self._logger.debug('Setting Alert Select bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
+		self._debug('Setting Alert Select bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
 
 	def clearAlertSel(self):
 		"""Clear Alert Select bit on the config register"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Clear the Alert Select bit
 		new_config = config & ~MCP9808_REG_CONFIG_ALERTSEL
-		self._logger.debug('Clearing Alert Select bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-	
+		self._debug('Clearing Alert Select bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
+
 	def setAlertPol(self):
 		"""Set Alert Polarity bit on the config register"""
 		# Read the config Register
-        	config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Set the Alert Polarity bit
 		new_config = config | MCP9808_REG_CONFIG_ALERTPOL
-		self._logger.debug('Setting Alert Polarity bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
+		self._debug('Setting Alert Polarity bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
 
 	def clearAlertPol(self):
 		"""Clear Alert Polarity bit on the config register"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Clear the Alert Polarity bit
 		new_config = config & ~MCP9808_REG_CONFIG_ALERTPOL
-		self._logger.debug('Clearing Alert Polarity bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
-	
+		self._debug('Clearing Alert Polarity bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
+
 	def setAlertMode(self):
 		"""Set Alert Mode bit on the config register"""
 		# Read the config Register
-        	config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Set the Alert Mode bit
 		new_config = config | MCP9808_REG_CONFIG_ALERTMODE
-		self._logger.debug('Setting Alert Mode bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
+		self._debug('Setting Alert Mode bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
 
 	def clearAlertMode(self):
 		"""Clear Alert Mode bit on the config register"""
 		# Read the config Register
-		config = self._device.readU16BE(MCP9808_REG_CONFIG)
+		config = self._read16(MCP9808_REG_CONFIG)
 		# Clear the Alert Mode bit
 		new_config = config & ~MCP9808_REG_CONFIG_ALERTMODE
-		self._logger.debug('Clearing Alert Mode bit: {0:#06X}'.format(new_config))
-		if new_config < 0x00FF:
-			self._device.write16(MCP9808_REG_CONFIG, new_config << 8)
-		else:
-			self._device.write16(MCP9808_REG_CONFIG, self._i2c.reverseByteOrder(new_config))
+		self._debug('Clearing Alert Mode bit: {0:#06X}', new_config)
+		self._write16(MCP9808_REG_CONFIG, new_config)
 
 	def readTempC(self):
 		"""Read sensor and return its value in degrees celsius."""
 		# Read temperature register value.
-		t = self._device.readU16BE(MCP9808_REG_AMBIENT_TEMP)
-		self._logger.debug('Raw ambient temp register value: 0x{0:04X}'.format(t & 0xFFFF))
+		t = self._readAmbient()
+		if self._logger.isEnabledFor(logging.DEBUG):
+			self._logger.debug('Raw ambient temp register value: 0x{0:04X}'.format(t & 0xFFFF))
 		# Scale and convert to signed value.
-		upperByte = t & 0x0F00
-		lowerByte = t & 0x00FF
-		if t & 0x1000:
-			temp = (((upperByte >> 8) * 16) + (lowerByte / 16.0)) * (-1)
-		else:
-			temp = ((upperByte >> 8) * 16) + (lowerByte / 16.0)
-		return temp
-	
+		return decodeTemp(t)
+
+	def read(self):
+		"""Read the ambient temperature register once and return a MCP9808Reading with the temperature
+		and the alert flags of the same sample"""
+		timestamp = _monotonic()
+		t = self._readAmbient()
+		ambient = self._ambient
+		if ambient is not None and ambient[1] == t:
+			# Coalesced read, report when the register was actually read
+			timestamp = ambient[0]
+		return MCP9808Reading(t, timestamp)
+
+	def readOneShot(self):
+		"""Wake the sensor up, wait one conversion time, read the ambient temperature register and shut
+		the sensor down, returns a MCP9808Reading. The sensor is always left shut down, even if it was
+		running before the call. It takes 3 bus transactions when the config and resolution registers
+		are cached (see cache and refresh()), 4 otherwise, and the first call takes one more to read
+		the resolution for conversionTime() unless it is already known"""
+		config = self._read16(MCP9808_REG_CONFIG) & ~MCP9808_REG_CONFIG_VOLATILE
+		period = self.conversionTime()
+		self._write16(MCP9808_REG_CONFIG, config & ~MCP9808_REG_CONFIG_SHUTDOWN)
+		try:
+			time.sleep(period)
+			timestamp = _monotonic()
+			t = self._device.readU16BE(MCP9808_REG_AMBIENT_TEMP)
+		finally:
+			self._write16(MCP9808_REG_CONFIG, config | MCP9808_REG_CONFIG_SHUTDOWN)
+		return MCP9808Reading(t, timestamp)
+
+	def readTempRaw(self):
+		"""Read sensor and return the raw ambient temperature register word, decodeTemp converts it
+		to degrees celsius"""
+		return self._readAmbient()
+
 	def getAlertOutput(self):
 		"""This function will return the cause of the alert output trigger, it will return
 		the bits 13 14 and 15 of the TA Register mapped into an int"""
 		# Read temperature register value.
-		t = self._device.readU16BE(MCP9808_REG_AMBIENT_TEMP)
+		t = self._readAmbient()
 		return (t & 0xE000) >> 13
-	
+
 	def setResolution(self, res = 0.0625):
 		"""Set the Sensor Resolution, the resolution could be set to 0.5, 0.25, 0.125 or 0.0625 this function
 		returns a list with [a,b], a is 1 if resolution is valid and 0 if it is not, b is the new value of the 
-		config register if it was successfull and if was not it returns an Error String"""
+		8 bit resolution register if it was successfull and if was not it returns an Error String"""
 		# Validate res
 		if res == 0.5:
-			self._device.write8(MCP9808_REG_RESOLUTION, 0x00)
-			self._logger.debug('Resolution Set to: {0:#04X}'.format(0x00))
-			return [1, self._device.readU16BE(MCP9808_REG_RESOLUTION)]
+			r = 0x00
 		elif res == 0.25:
-                        self._device.write8(MCP9808_REG_RESOLUTION, 0x01)
-                        self._logger.debug('Resolution Set to: {0:#04X}'.format(0x01))
-			return [1, self._device.readU16BE(MCP9808_REG_RESOLUTION)]
+			r = 0x01
 		elif res == 0.125:
-                        self._device.write8(MCP9808_REG_RESOLUTION, 0x02)
-                        self._logger.debug('Resolution Set to: {0:#04X}'.format(0x02))
-			return [1, self._device.readU16BE(MCP9808_REG_RESOLUTION)]
+			r = 0x02
 		elif res == 0.0625:
-                        self._device.write8(MCP9808_REG_RESOLUTION, 0x03)
-                        self._logger.debug('Resolution Set to: {0:#04X}'.format(0x03))
-			return [1, self._device.readU16BE(MCP9808_REG_RESOLUTION)]
+			r = 0x03
 		else:
-			return [0, 'Sensor Resolution is not valid, Valid Values are: 0.5, 0.25, 0.125, +0.0625']
 			self._logger.debug('Error with the resolution passed')
+			return [0, 'Sensor Resolution is not valid, Valid Values are: 0.5, 0.25, 0.125, +0.0625']
+		self._writeResolution(r)
+		# The conversion in progress restarts with the new resolution
+		self._resolution = r
+		self._ambient = None
+		self._debug('Resolution Set to: {0:#04X}', r)
+		# Read back from the device, or the shadow copy with the cache
+		return [1, self._readResolution()]
 
 	def getResolution(self):
 		"""Get Resolution Register, return a string with the resolution configured"""
 		# Read the Resolution Register
-		resolution = self._device.readU8(MCP9808_REG_RESOLUTION)
-		self._logger.debug('The Resolution is: {0:#06X}'.format(resolution))
+		resolution = self._readResolution()
+		self._debug('The Resolution is: {0:#06X}', resolution)
 		if resolution == 0x00:
 			return 'Resolution is set to 0.5 Degrees Celsius'
 		elif resolution == 0x01:
@@ -369,123 +769,121 @@ class MCP9808(object):
 			return 'Resolution is set to 0.125 Degrees Celsius'
 		elif resolution == 0x03:
 			return 'Resolution is set to 0.0625 Degrees Celsius'
-			
+
 	def setUpperTemp(self, temp=0):
 		"""Set the Temperature Upper Register with a resolution of 0.25 Degree Celsius, if the temperature passed
 		to the funcition is not in that resolution it will be rounded by defect to the nearest decimal resolution"""
-		#Check if temp is float
-		if isinstance(temp, int):
-			temp = float(temp)
-		#Divide Integer from decimal parts
-		t = math.modf(abs(temp))
-		temp_int = int(t[1])
-		temp_dec = t[0]
-		# Round decimal parts to 0.25 steps
-		if temp_dec >= 0 and temp_dec < 0.25:
-			temp_dec = 0x00
-		elif temp_dec >= 0.25 and temp_dec < 0.5:
-			temp_dec = 0x01
-		elif temp_dec >= 0.5 and temp_dec < 0.75:
-			temp_dec = 0x02
-		elif temp_dec >= 0.75 and temp_dec < 1:
-			temp_dec = 0x03
-		#Calculate the new temperature to write
-		new_temp = 0
-		new_temp = ((temp_int << 4) | (temp_dec << 2)) & 0x0FFC
-		#Set Sign if it is negative
-		if temp < 0:
-			new_temp = new_temp | 0x1000
+		new_temp = encodeTemp(temp)
 		# Write to Register
-		self._logger.debug('Raw temp set in Upper temp register: {0:#06X}'.format(new_temp))
-		self._device.write16(MCP9808_REG_UPPER_TEMP, self._i2c.reverseByteOrder(new_temp))
-	
+		self._debug('Raw temp set in Upper temp register: {0:#06X}', new_temp)
+		self._write16(MCP9808_REG_UPPER_TEMP, new_temp)
+
 	def getUpperTemp(self, temp=0):
 		"""Get the Temperature Upper Register"""
-		t = self._device.readU16BE(MCP9808_REG_UPPER_TEMP)
-		upperByte = t & 0x0F00
-		lowerByte = t & 0x00FC
-		if t & 0x1000:
-			temp = (((upperByte >> 8) * 16) + (lowerByte / 16.0)) * (-1)
-		else:
-			temp = ((upperByte >> 8) * 16) + (lowerByte / 16.0)
-		return temp
-		
+		t = self._read16(MCP9808_REG_UPPER_TEMP)
+		return decodeTemp(t & 0x1FFC)
+
 	def setLowerTemp(self, temp=0):
 		"""Set the Temperature Lower Register with a resolution of 0.25 Degree Celsius, if the temperature passed
 		to the funcition is not in that resolution it will be rounded by defect to the nearest decimal resolution"""
-		#Check if temp is float
-		if isinstance(temp, int):
-			temp = float(temp)
-		#Divide Integer from decimal parts
-		t = math.modf(abs(temp))
-		temp_int = int(t[1])
-		temp_dec = t[0]
-		# Round decimal parts to 0.25 steps
-		if temp_dec >= 0 and temp_dec < 0.25:
-			temp_dec = 0x00
-		elif temp_dec >= 0.25 and temp_dec < 0.5:
-			temp_dec = 0x01
-		elif temp_dec >= 0.5 and temp_dec < 0.75:
-			temp_dec = 0x02
-		elif temp_dec >= 0.75 and temp_dec < 1:
-			temp_dec = 0x03
-		#Calculate the new temperature to write
-		new_temp = 0
-		new_temp = ((temp_int << 4) | (temp_dec << 2)) & 0x0FFC
-		#Set Sign if it is negative
-		if temp < 0:
-			new_temp = new_temp | 0x1000
+		new_temp = encodeTemp(temp)
 		# Write to Register
-		self._logger.debug('Raw temp set in Lower temp register: {0:#06X}'.format(new_temp))
-		self._device.write16(MCP9808_REG_LOWER_TEMP, self._i2c.reverseByteOrder(new_temp))
-	
+		self._debug('Raw temp set in Lower temp register: {0:#06X}', new_temp)
+		self._write16(MCP9808_REG_LOWER_TEMP, new_temp)
+
 	def getLowerTemp(self, temp=0):
 		"""Get the Temperature Lower Register"""
-		t = self._device.readU16BE(MCP9808_REG_LOWER_TEMP)
-		upperByte = t & 0x0F00
-		lowerByte = t & 0x00FC
-		if t & 0x1000:
-			temp = (((upperByte >> 8) * 16) + (lowerByte / 16.0)) * (-1)
-		else:
-			temp = ((upperByte >> 8) * 16) + (lowerByte / 16.0)
-		return temp
-	
+		t = self._read16(MCP9808_REG_LOWER_TEMP)
+		return decodeTemp(t & 0x1FFC)
+
 	def setCritTemp(self, temp=0):
 		"""Set the Temperature Lower Register with a resolution of 0.25 Degree Celsius, if the temperature passed
 		to the funcition is not in that resolution it will be rounded by defect to the nearest decimal resolution"""
-		#Check if temp is float
-		if isinstance(temp, int):
-			temp = float(temp)
-		#Divide Integer from decimal parts
-		t = math.modf(abs(temp))
-		temp_int = int(t[1])
-		temp_dec = t[0]
-		# Round decimal parts to 0.25 steps
-		if temp_dec >= 0 and temp_dec < 0.25:
-			temp_dec = 0x00
-		elif temp_dec >= 0.25 and temp_dec < 0.5:
-			temp_dec = 0x01
-		elif temp_dec >= 0.5 and temp_dec < 0.75:
-			temp_dec = 0x02
-		elif temp_dec >= 0.75 and temp_dec < 1:
-			temp_dec = 0x03
-		#Calculate the new temperature to write
-		new_temp = 0
-		new_temp = ((temp_int << 4) | (temp_dec << 2)) & 0x0FFC
-		#Set Sign if it is negative
-		if temp < 0:
-			new_temp = new_temp | 0x1000
+		new_temp = encodeTemp(temp)
 		# Write to Register
-		self._logger.debug('Raw temp set in Critical temp register: {0:#06X}'.format(new_temp))
-		self._device.write16(MCP9808_REG_CRIT_TEMP, self._i2c.reverseByteOrder(new_temp))
-	
+		self._debug('Raw temp set in Critical temp register: {0:#06X}', new_temp)
+		self._write16(MCP9808_REG_CRIT_TEMP, new_temp)
+
 	def getCritTemp(self, temp=0):
 		"""Get the Temperature Lower Register"""
-		t = self._device.readU16BE(MCP9808_REG_CRIT_TEMP)
-		upperByte = t & 0x0F00
-		lowerByte = t & 0x00FC
-		if t & 0x1000:
-			temp = (((upperByte >> 8) * 16) + (lowerByte / 16.0)) * (-1)
+		t = self._read16(MCP9808_REG_CRIT_TEMP)
+		return decodeTemp(t & 0x1FFC)
+
+
+def _configBit(mask, doc):
+	"""Build a boolean property for a bit of the pending config register value"""
+	def fget(self):
+		return bool(self.value & mask)
+	def fset(self, enabled):
+		if enabled:
+			self.value |= mask
+		else:
+			self.value &= ~mask
+	return property(fget, fset, doc=doc)
+
+
+class MCP9808Config(object):
+	"""Pending change of the MCP9808 config register, every attribute updates the value in memory and
+	commit() writes it to the device with a single write. It is normally used through MCP9808.configure()
+	"""
+
+	def __init__(self, sensor, clear=False, verify=False):
+		self._sensor = sensor
+		self._verify = verify
+		self.value = None
+		self.verified = None
+		self._clear = clear
+
+	def __enter__(self):
+		self.begin()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			self.commit()
+		return False
+
+	def begin(self):
+		"""Load the starting config register value, one read unless clear was requested or it is cached"""
+		if self._clear:
+			self.value = 0x0000
 		else:
-			temp = ((upperByte >> 8) * 16) + (lowerByte / 16.0)
-		return temp
+			self.value = self._sensor._read16(MCP9808_REG_CONFIG)
+		return self
+
+	def commit(self):
+		"""Write the config register, returns the value written or the value read back if verify was requested"""
+		new_config = self.value & 0xFFFF
+		self._sensor._write16(MCP9808_REG_CONFIG, new_config)
+		self._sensor._debug('Config register set: {0:#06X}', new_config)
+		if not self._verify:
+			return new_config
+		# Read back from the device, the status and interrupt clear bits are not compared
+		config = self._sensor._device.readU16BE(MCP9808_REG_CONFIG)
+		mask = ~MCP9808_REG_CONFIG_VOLATILE & 0xFFFF
+		self.verified = (config & mask) == (new_config & mask)
+		if self._sensor._cache:
+			self._sensor._shadow[MCP9808_REG_CONFIG] = config & mask
+		return config
+
+	def _getHysteresis(self):
+		bits = self.value & MCP9808_REG_CONFIG_HYST
+		for thyst, t in MCP9808_HYST_BITS.items():
+			if t == bits:
+				return thyst
+
+	def _setHysteresis(self, thyst):
+		if thyst not in MCP9808_HYST_BITS:
+			raise ValueError('Temperature Hysteresis is not valid, Valid Values are: 0, +1.5, +3, +6')
+		self.value = (self.value & ~MCP9808_REG_CONFIG_HYST) | MCP9808_HYST_BITS[thyst]
+
+	hysteresis = property(_getHysteresis, _setHysteresis, doc='Temperature hysteresis, 0, +1.5, +3 or +6 Celsius Degrees')
+	shutdown = _configBit(MCP9808_REG_CONFIG_SHUTDOWN, 'Shutdown bit')
+	crit_lock = _configBit(MCP9808_REG_CONFIG_CRITLOCKED, 'Critical lock bit, it can only be cleared by a power reset')
+	win_lock = _configBit(MCP9808_REG_CONFIG_WINLOCKED, 'Window lock bit, it can only be cleared by a power reset')
+	int_clr = _configBit(MCP9808_REG_CONFIG_INTCLR, 'Interrupt Clear bit')
+	alert_stat = _configBit(MCP9808_REG_CONFIG_ALERTSTAT, 'Alert Status bit')
+	alert_ctrl = _configBit(MCP9808_REG_CONFIG_ALERTCTRL, 'Alert Control bit')
+	alert_sel = _configBit(MCP9808_REG_CONFIG_ALERTSEL, 'Alert Select bit')
+	alert_pol = _configBit(MCP9808_REG_CONFIG_ALERTPOL, 'Alert Polarity bit')
+	alert_mode = _configBit(MCP9808_REG_CONFIG_ALERTMODE, 'Alert Mode bit')
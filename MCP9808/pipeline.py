@@ -0,0 +1,113 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Generator stages to reduce a stream of temperature samples, every stage takes an iterable of
+(timestamp, temperature) pairs and keeps a constant amount of state:
+
+	from MCP9808.pipeline import samples, changes, downsample, aggregate
+
+	# Only the readings that moved at least 2 resolution steps, at most one per minute
+	for timestamp, temp in downsample(changes(samples(sensor), sensor, steps=2), 60):
+		print(timestamp, temp)
+
+	# min, max and mean of every 5 minutes
+	for window in aggregate(samples(sensor), 300):
+		print(window.start, window.min, window.max, window.mean)
+"""
+from collections import namedtuple
+import math
+import time
+
+from MCP9808.mcp9808 import MCP9808_RESOLUTION_STEP, decodeTemp
+from MCP9808.schedule import Schedule
+
+# Summary of the samples of a time window emitted by aggregate().
+Aggregate = namedtuple('Aggregate', ('start', 'end', 'count', 'min', 'max', 'mean'))
+
+
+def samples(sensor, period=None, count=None):
+	"""Read the sensor every period seconds, by default every conversion time, and yield (timestamp,
+	temperature) with the monotonic timestamp of the read. Stops after count samples if given"""
+	if period is None:
+		period = sensor.conversionTime()
+	schedule = Schedule(period)
+	n = 0
+	while count is None or n < count:
+		reading = sensor.read()
+		yield reading.timestamp, reading.tempC
+		n += 1
+		time.sleep(schedule.advance())
+
+
+def decoded(raw_samples):
+	"""Convert (timestamp, raw register word) pairs, as yielded by MCP9808Sampler, to (timestamp,
+	temperature)"""
+	for timestamp, raw in raw_samples:
+		yield timestamp, decodeTemp(raw)
+
+
+def changes(samples, sensor=None, steps=1, step=None):
+	"""Yield only the samples that differ from the last one yielded by at least steps times the
+	resolution step. The step is taken from the sensor resolution (see MCP9808.resolutionStep())
+	unless it is given, the first sample is always yielded"""
+	if step is None:
+		step = sensor.resolutionStep() if sensor is not None else MCP9808_RESOLUTION_STEP[-1]
+	# Half a step of margin, the temperatures are multiples of the step
+	threshold = steps * step - step / 2.0
+	last = None
+	for timestamp, temp in samples:
+		if last is None or abs(temp - last) >= threshold:
+			last = temp
+			yield timestamp, temp
+
+
+def downsample(samples, interval):
+	"""Yield at most one sample per interval seconds, the first sample of every interval aligned to
+	multiples of interval"""
+	current = None
+	for timestamp, temp in samples:
+		slot = math.floor(timestamp / interval)
+		if slot != current:
+			current = slot
+			yield timestamp, temp
+
+
+def aggregate(samples, interval):
+	"""Yield an Aggregate with the count, min, max and mean of the samples of every interval seconds,
+	the windows are aligned to multiples of interval and a window is yielded when the first sample of
+	the next one arrives or when the input ends"""
+	current = None
+	for timestamp, temp in samples:
+		slot = math.floor(timestamp / interval)
+		if slot != current:
+			if current is not None:
+				yield Aggregate(current * interval, (current + 1) * interval, count, low, high, total / count)
+			current = slot
+			count = 0
+			total = 0.0
+			low = high = temp
+		count += 1
+		total += temp
+		if temp < low:
+			low = temp
+		elif temp > high:
+			high = temp
+	if current is not None:
+		yield Aggregate(current * interval, (current + 1) * interval, count, low, high, total / count)
@@ -0,0 +1,199 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Continuous sampling of a MCP9808 on a background thread:
+
+	import MCP9808.mcp9808 as mcp
+	from MCP9808.sampler import MCP9808Sampler
+
+	with MCP9808Sampler(mcp.MCP9808(), rate=4.0, size=4096) as sampler:
+		for timestamp, raw in sampler:
+			print(mcp.decodeTemp(raw))
+"""
+from array import array
+import logging
+import threading
+import time
+
+from MCP9808.mcp9808 import _monotonic, decodeTemp, decodeTemps
+from MCP9808.schedule import Schedule
+
+
+class MCP9808Sampler(object):
+	"""Read the ambient temperature register of a MCP9808 at a fixed rate on its own thread and keep the
+	last size raw words and their monotonic timestamps in a preallocated ring buffer. The sampler is the
+	only writer, consumers never take a lock, a window copied while the sampler overwrites it drops the
+	overwritten samples. If oneshot is True the sensor is kept in shutdown between samples and every
+	sample is taken with MCP9808.readOneShot(), for low rates this saves most of the sensor power.
+	"""
+
+	def __init__(self, sensor, rate=4.0, size=1024, clock=_monotonic, oneshot=False):
+		if size < 2:
+			raise ValueError('The ring buffer needs room for at least 2 samples')
+		self._logger = logging.getLogger('MCP9808')
+		self._sensor = sensor
+		self.period = 1.0 / rate
+		self.oneshot = oneshot
+		self.size = size
+		self._clock = clock
+		self._words = array('H', [0]) * size
+		self._times = array('d', [0.0]) * size
+		# Number of samples written since the start, the next one goes to _count % size
+		self._count = 0
+		self.errors = 0
+		self.missed = 0
+		self._stop = threading.Event()
+		self._thread = None
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.stop()
+		return False
+
+	def __len__(self):
+		return min(self._count, self.size)
+
+	@property
+	def count(self):
+		"""Number of samples taken since the sampler started"""
+		return self._count
+
+	@property
+	def running(self):
+		"""True while the sampling thread is alive"""
+		return self._thread is not None and self._thread.is_alive()
+
+	def start(self):
+		"""Start the sampling thread"""
+		if self.running:
+			return
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, name='MCP9808Sampler')
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self, timeout=None):
+		"""Stop the sampling thread and wait for it to finish"""
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+
+	def _run(self):
+		# Sample on a fixed schedule, slots missed because a read was late are skipped
+		schedule = Schedule(self.period, self._clock)
+		while not self._stop.is_set():
+			try:
+				if self.oneshot:
+					raw = self._sensor.readOneShot().raw
+				else:
+					raw = self._sensor.readTempRaw()
+			except IOError as e:
+				self.errors += 1
+				self._logger.debug('Error reading the ambient temperature: {0}'.format(e))
+			else:
+				self.append(self._clock(), raw)
+			delay = schedule.advance()
+			self.missed += schedule.skipped
+			self._stop.wait(delay)
+
+	def append(self, timestamp, raw):
+		"""Store a sample in the ring buffer, only the sampling thread should call it"""
+		i = self._count % self.size
+		self._words[i] = raw & 0xFFFF
+		self._times[i] = timestamp
+		self._count += 1
+
+	def latest(self):
+		"""Return the last (timestamp, raw) sample or None if there is none yet"""
+		while True:
+			count = self._count
+			if not count:
+				return None
+			i = (count - 1) % self.size
+			sample = (self._times[i], self._words[i])
+			# The slot is only reused once size - 1 newer samples were taken
+			if self._count - count < self.size - 1:
+				return sample
+
+	def latestTempC(self):
+		"""Return the last temperature in degrees celsius or None if there is no sample yet"""
+		sample = self.latest()
+		if sample is None:
+			return None
+		return decodeTemp(sample[1])
+
+	def _copy(self, start, end):
+		# Copy the samples [start, end) out of the ring, returns the first sample still valid
+		times = array('d')
+		words = array('H')
+		for n in range(start, end):
+			i = n % self.size
+			times.append(self._times[i])
+			words.append(self._words[i])
+		# Samples overwritten while copying are dropped, including the slot being written now
+		first = max(start, self._count - self.size + 1)
+		return first, times[first - start:], words[first - start:]
+
+	def window(self, n=None, since=None):
+		"""Return (timestamps, raw words) arrays with the last n samples, or with the samples taken after
+		the since monotonic timestamp, oldest first"""
+		end = self._count
+		start = max(0, end - self.size)
+		if n is not None:
+			start = max(start, end - n)
+		first, times, words = self._copy(start, end)
+		if since is not None:
+			skip = 0
+			while skip < len(times) and times[skip] <= since:
+				skip += 1
+			times, words = times[skip:], words[skip:]
+		return times, words
+
+	def windowTempC(self, n=None, since=None):
+		"""Return (timestamps, temperatures) arrays like window with the values in degrees celsius"""
+		times, words = self.window(n, since)
+		return times, decodeTemps(words)
+
+	def iterate(self, timeout=None):
+		"""Yield every new (timestamp, raw) sample as it is taken, samples overwritten before the
+		consumer got to them are skipped. Stops when the sampler stops or after timeout seconds
+		without a new sample"""
+		cursor = self._count
+		waited = 0.0
+		while True:
+			end = self._count
+			if end == cursor:
+				if not self.running or (timeout is not None and waited >= timeout):
+					return
+				time.sleep(self.period / 2)
+				waited += self.period / 2
+				continue
+			waited = 0.0
+			first, times, words = self._copy(max(cursor, end - self.size), end)
+			for sample in zip(times, words):
+				yield sample
+			cursor = end
+
+	def __iter__(self):
+		return self.iterate()
@@ -0,0 +1,63 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Fixed rate scheduling of the loops that poll the sensors, a late loop skips the periods it missed
+instead of running them in a burst:
+
+	from MCP9808.schedule import Schedule
+
+	schedule = Schedule(0.25)
+	while True:
+		print(sensor.readTempC())
+		time.sleep(schedule.advance())
+"""
+from MCP9808.mcp9808 import _monotonic
+
+
+class Schedule(object):
+	"""Deadlines of a loop running every period seconds. advance() moves to the next deadline and returns
+	the seconds to wait for it, when the loop is late the missed deadlines are skipped instead of being
+	caught up in a burst and skipped tells how many were"""
+
+	def __init__(self, period=None, clock=_monotonic):
+		self.period = period
+		self.skipped = 0
+		self._clock = clock
+		self.deadline = clock()
+
+	def reset(self):
+		"""Count the next period from now"""
+		self.deadline = self._clock()
+
+	def advance(self, period=None):
+		"""Move to the deadline period seconds after the last one, by default the period of the schedule,
+		and return the seconds until it"""
+		if period is None:
+			period = self.period
+		now = self._clock()
+		self.deadline += period
+		self.skipped = 0
+		if self.deadline < now:
+			if period > 0:
+				self.skipped = int((now - self.deadline) // period) + 1
+				self.deadline += self.skipped * period
+			else:
+				self.deadline = now
+		return self.deadline - now
@@ -0,0 +1,264 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Share the readings of the sensors between processes. A single process polls the sensors and
+publishes the last raw word of every sensor in a shared memory segment, the other processes read it
+from memory without touching the bus:
+
+	# Poller process
+	from MCP9808.manager import MCP9808Manager
+	from MCP9808.shm import MCP9808Publisher
+
+	manager = MCP9808Manager(buses=(1,))
+	manager.discover()
+	with MCP9808Publisher('mcp9808', manager, period=0.25):
+		...
+
+	# Any other process
+	from MCP9808.shm import MCP9808SharedReader
+
+	sensor = MCP9808SharedReader('mcp9808', address=0x18, busnum=1)
+	print(sensor.readTempC(), sensor.getAlertOutput())
+
+Every slot is protected by a sequence counter (seqlock), the publisher makes it odd while it writes the
+slot and the readers retry until they see the same even value before and after reading it.
+
+The readers do not let the multiprocessing resource tracker remove the segment when they exit. Before
+Python 3.13 a reader started with multiprocessing from the publisher process shares its tracker, run
+the readers as separate programs there.
+"""
+import errno
+import logging
+from multiprocessing import shared_memory
+import struct
+import threading
+import time
+
+from MCP9808.mcp9808 import MCP9808_I2CADDR_DEFAULT, MCP9808Reading, _monotonic, decodeTemp
+from MCP9808.schedule import Schedule
+
+SHM_MAGIC                      = 0x4D393038
+SHM_VERSION                    = 1
+
+# magic, version, number of slots, 8 reserved bytes.
+_header = struct.Struct('<IHH8x')
+# sequence, bus number, address, raw word, monotonic timestamp, number of readings, errors.
+_slot = struct.Struct('<IBBHdQI4x')
+_seq = struct.Struct('<I')
+
+# Busy retries of a reader before it sleeps between retries, and how long it retries.
+_SPIN_RETRIES                  = 100
+_LOAD_TIMEOUT                  = 1.0
+
+# Segments created by the publishers of this process, their tracker registration is kept.
+_published = set()
+
+def _attach(name):
+	# Attach without letting the resource tracker unlink the segment when this process exits
+	try:
+		return shared_memory.SharedMemory(name=name, track=False)
+	except TypeError:
+		pass
+	# Before Python 3.13 attaching always registers the segment, unregister this one segment unless
+	# it is the registration of a publisher of this process
+	shm = shared_memory.SharedMemory(name=name)
+	if name not in _published:
+		shared_memory.resource_tracker.unregister(shm._name, 'shared_memory')
+	return shm
+
+
+class MCP9808Publisher(object):
+	"""Poll every sensor of a MCP9808Manager every period seconds on a thread and publish the readings in
+	the shared memory segment name, created with a slot per sensor found by the manager"""
+
+	def __init__(self, name, manager, period=0.25):
+		self._logger = logging.getLogger('MCP9808')
+		self.name = name
+		self.manager = manager
+		self.period = period
+		self.keys = sorted((busnum, address) for busnum, sensors in manager.sensors.items()
+			for address, sensor in sensors)
+		self._slots = dict((key, i) for i, key in enumerate(self.keys))
+		self._shm = shared_memory.SharedMemory(name=name, create=True,
+			size=_header.size + _slot.size * max(len(self.keys), 1))
+		_published.add(name)
+		buf = self._shm.buf
+		_header.pack_into(buf, 0, SHM_MAGIC, SHM_VERSION, len(self.keys))
+		for i, (busnum, address) in enumerate(self.keys):
+			_slot.pack_into(buf, self._offset(i), 0, busnum, address, 0, 0.0, 0, 0)
+		self._stop = threading.Event()
+		self._thread = None
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+		return False
+
+	@staticmethod
+	def _offset(i):
+		return _header.size + i * _slot.size
+
+	def publish(self, key, reading):
+		"""Write a MCP9808Reading, or None for a failed read, to the slot of (busnum, address)"""
+		buf = self._shm.buf
+		offset = self._offset(self._slots[key])
+		seq, busnum, address, raw, timestamp, count, errors = _slot.unpack_from(buf, offset)
+		# Odd while the slot is being written
+		_seq.pack_into(buf, offset, (seq + 1) & 0xFFFFFFFF)
+		if reading is None:
+			errors += 1
+		else:
+			raw, timestamp, count = reading.raw, reading.timestamp, count + 1
+		_slot.pack_into(buf, offset, (seq + 1) & 0xFFFFFFFF, busnum, address, raw, timestamp, count, errors & 0xFFFFFFFF)
+		_seq.pack_into(buf, offset, (seq + 2) & 0xFFFFFFFF)
+
+	def poll(self):
+		"""Read every sensor once and publish the readings"""
+		for key, reading in self.manager.poll().items():
+			if key in self._slots:
+				self.publish(key, reading)
+
+	def start(self):
+		"""Start the polling thread"""
+		if self._thread is not None:
+			return
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, name='MCP9808Publisher')
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self, timeout=None):
+		"""Stop the polling thread"""
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+
+	def _run(self):
+		schedule = Schedule(self.period)
+		while not self._stop.is_set():
+			try:
+				self.poll()
+			except Exception:
+				self._logger.exception('Error publishing the readings')
+			self._stop.wait(schedule.advance())
+
+	def close(self):
+		"""Stop the thread and remove the shared memory segment"""
+		self.stop()
+		self._shm.close()
+		try:
+			self._shm.unlink()
+		except OSError:
+			pass
+		_published.discard(self.name)
+
+
+class MCP9808SharedReader(object):
+	"""Read only view of one sensor published by a MCP9808Publisher, with the same reading methods as
+	MCP9808. The readings come from memory, the sensor is only read at the publisher period"""
+
+	def __init__(self, name, address=MCP9808_I2CADDR_DEFAULT, busnum=None):
+		"""busnum can be None when the address is only used on one bus"""
+		self._shm = _attach(name)
+		buf = self._shm.buf
+		magic, version, slots = _header.unpack_from(buf, 0)
+		if magic != SHM_MAGIC or version != SHM_VERSION:
+			self._shm.close()
+			raise ValueError('{0} is not a MCP9808 shared memory segment'.format(name))
+		self._offset = None
+		for i in range(slots):
+			offset = _header.size + i * _slot.size
+			seq, slotbus, slotaddress = _slot.unpack_from(buf, offset)[:3]
+			if slotaddress == address and (busnum is None or slotbus == busnum):
+				self._offset = offset
+				break
+		if self._offset is None:
+			self._shm.close()
+			raise ValueError('No sensor {0:#04X} published in {1}'.format(address, name))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+		return False
+
+	def _load(self):
+		# Seqlock read of the slot, the payload is copied between two reads of the same even sequence
+		buf = self._shm.buf
+		offset = self._offset
+		deadline = None
+		retries = 0
+		while True:
+			seq = _seq.unpack_from(buf, offset)[0]
+			if not seq & 1:
+				values = _slot.unpack_from(buf, offset)
+				if _seq.unpack_from(buf, offset)[0] == seq:
+					return values
+			retries += 1
+			if retries < _SPIN_RETRIES:
+				continue
+			# The publisher is slow or died in the middle of a write
+			now = _monotonic()
+			if deadline is None:
+				deadline = now + _LOAD_TIMEOUT
+			elif now >= deadline:
+				raise IOError(errno.EAGAIN, 'The slot of the sensor is not stable, is the publisher running?')
+			time.sleep(0.0001)
+
+	def read(self):
+		"""Return the last published MCP9808Reading, None if there is none yet"""
+		seq, busnum, address, raw, timestamp, count, errors = self._load()
+		if not count:
+			return None
+		return MCP9808Reading(raw, timestamp)
+
+	@property
+	def sequence(self):
+		"""Number of readings published for the sensor"""
+		return self._load()[5]
+
+	@property
+	def errors(self):
+		"""Number of failed reads of the sensor"""
+		return self._load()[6]
+
+	def readTempRaw(self):
+		"""Return the last published raw ambient temperature register word, None if there is none yet"""
+		values = self._load()
+		return values[3] if values[5] else None
+
+	def readTempC(self):
+		"""Return the last published temperature in degrees celsius, None if there is none yet"""
+		raw = self.readTempRaw()
+		return None if raw is None else decodeTemp(raw)
+
+	def getAlertOutput(self):
+		"""Return the bits 13 14 and 15 of the last published TA register mapped into an int, None if
+		there is none yet"""
+		raw = self.readTempRaw()
+		return None if raw is None else (raw & 0xE000) >> 13
+
+	def close(self):
+		self._shm.close()
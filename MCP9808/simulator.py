@@ -0,0 +1,367 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""In memory MCP9808 simulator, it can be passed as the i2c argument of MCP9808 to run the driver
+without hardware:
+
+	import MCP9808.mcp9808 as mcp
+	from MCP9808.simulator import SimulatedI2C
+
+	bus = SimulatedI2C(latency=0.0002)
+	sensor = mcp.MCP9808(i2c=bus)
+	bus.get_i2c_device(0x18).temperature = 21.5
+"""
+import ctypes
+import errno
+import math
+import os
+import re
+import struct
+import threading
+import time
+
+from MCP9808.mcp9808 import (MCP9808_CONVERSION_TIME, MCP9808_I2CADDR_DEFAULT, MCP9808_REG_AMBIENT_TEMP,
+	MCP9808_REG_CONFIG, MCP9808_REG_CONFIG_ALERTCTRL, MCP9808_REG_CONFIG_ALERTMODE, MCP9808_REG_CONFIG_ALERTSEL,
+	MCP9808_REG_CONFIG_ALERTSTAT, MCP9808_REG_CONFIG_CRITLOCKED, MCP9808_REG_CONFIG_INTCLR,
+	MCP9808_REG_CONFIG_LOCKED_BY_ANY, MCP9808_REG_CONFIG_LOCKED_BY_WIN, MCP9808_REG_CONFIG_LOCKS,
+	MCP9808_REG_CONFIG_SHUTDOWN, MCP9808_REG_CONFIG_WINLOCKED, MCP9808_REG_CRIT_TEMP, MCP9808_REG_DEVICE_ID,
+	MCP9808_REG_LOWER_TEMP, MCP9808_REG_MANUF_ID, MCP9808_REG_RESOLUTION, MCP9808_REG_UPPER_TEMP, MCP9808_TA_CRIT,
+	MCP9808_TA_LOWER, MCP9808_TA_UPPER, _monotonic, decodeTemp, reverseByteOrder)
+
+
+def encodeAmbient(temp):
+	"""Convert a temperature in Celsius to the 13 bit ambient register format, 0.0625 Celsius steps"""
+	raw = int(math.floor(abs(temp) * 16.0 + 0.5)) & 0x0FFF
+	if temp < 0 and raw:
+		raw |= 0x1000
+	return raw
+
+
+class SimulatedMCP9808(object):
+	"""Simulated MCP9808 register map behind an Adafruit_GPIO.I2C.Device compatible interface.
+
+	The ambient register is updated from the temperature attribute (a number or a callable returning
+	the temperature) once every conversion time of the current resolution, conversions stop while the
+	shutdown bit is set. The lock bits, the read only interrupt clear bit and the TA alert bits 13-15
+	follow the datasheet, the alert output honours comparator/interrupt mode but ignores hysteresis. In
+	interrupt mode the interrupt is latched when TA crosses TUPPER or TLOWER in either direction, it stays
+	asserted until the interrupt clear bit is written.
+	"""
+
+	def __init__(self, address=MCP9808_I2CADDR_DEFAULT, temperature=25.0, latency=0.0, bus=None, clock=_monotonic):
+		self.address = address
+		self.temperature = temperature
+		self.latency = latency
+		self.transactions = 0
+		self.counts = {}
+		self._bus = bus
+		self._lock = threading.RLock()
+		self._clock = clock
+		self.reset()
+
+	def reset(self):
+		"""Power on reset, all the registers go back to their default values"""
+		with self._lock:
+			self.regs = {
+				MCP9808_REG_CONFIG: 0x0000,
+				MCP9808_REG_UPPER_TEMP: 0x0000,
+				MCP9808_REG_LOWER_TEMP: 0x0000,
+				MCP9808_REG_CRIT_TEMP: 0x0000,
+				MCP9808_REG_AMBIENT_TEMP: 0x0000,
+				MCP9808_REG_MANUF_ID: 0x0054,
+				MCP9808_REG_DEVICE_ID: 0x0400,
+				MCP9808_REG_RESOLUTION: 0x03,
+			}
+			self.interrupt = False
+			# TA upper and lower bits of the last conversion
+			self._window = 0
+			self._start = self._clock()
+			self._conversions = 0
+			self._convert()
+
+	@property
+	def conversionTime(self):
+		"""Conversion time in seconds for the current resolution"""
+		return MCP9808_CONVERSION_TIME[self.regs[MCP9808_REG_RESOLUTION] & 0x03]
+
+	@property
+	def alert(self):
+		"""True if the alert output is asserted, the polarity bit is not applied"""
+		with self._lock:
+			self._update()
+			return self._alertAsserted()
+
+	def _ambient(self):
+		if callable(self.temperature):
+			return self.temperature()
+		return self.temperature
+
+	def _convert(self):
+		# Latch a new ambient temperature and update the alert bits and output
+		raw = encodeAmbient(self._ambient())
+		# The LSBs below the resolution read as 0
+		raw &= ~((1 << (3 - (self.regs[MCP9808_REG_RESOLUTION] & 0x03))) - 1)
+		temp = decodeTemp(raw)
+		if temp >= decodeTemp(self.regs[MCP9808_REG_CRIT_TEMP]):
+			raw |= MCP9808_TA_CRIT
+		if temp > decodeTemp(self.regs[MCP9808_REG_UPPER_TEMP]):
+			raw |= MCP9808_TA_UPPER
+		if temp < decodeTemp(self.regs[MCP9808_REG_LOWER_TEMP]):
+			raw |= MCP9808_TA_LOWER
+		self.regs[MCP9808_REG_AMBIENT_TEMP] = raw
+		# The interrupt fires on a window boundary crossing, not while TA stays outside the window
+		window = raw & (MCP9808_TA_UPPER | MCP9808_TA_LOWER)
+		if window != self._window:
+			self._window = window
+			self.interrupt = True
+
+	def _update(self):
+		# Run the conversions completed since the last access
+		if self.regs[MCP9808_REG_CONFIG] & MCP9808_REG_CONFIG_SHUTDOWN:
+			return
+		done = int((self._clock() - self._start) / self.conversionTime)
+		if done != self._conversions:
+			self._conversions = done
+			self._convert()
+
+	def _alertAsserted(self):
+		config = self.regs[MCP9808_REG_CONFIG]
+		if not config & MCP9808_REG_CONFIG_ALERTCTRL:
+			return False
+		raw = self.regs[MCP9808_REG_AMBIENT_TEMP]
+		if config & MCP9808_REG_CONFIG_ALERTSEL:
+			return bool(raw & MCP9808_TA_CRIT)
+		if raw & MCP9808_TA_CRIT:
+			return True
+		if config & MCP9808_REG_CONFIG_ALERTMODE:
+			return self.interrupt
+		return bool(raw & (MCP9808_TA_UPPER | MCP9808_TA_LOWER))
+
+	def _transaction(self, operation, register):
+		# Account and delay one bus transaction
+		self.transactions += 1
+		key = (operation, register)
+		self.counts[key] = self.counts.get(key, 0) + 1
+		if self._bus is not None:
+			self._bus._transaction()
+		if self.latency:
+			time.sleep(self.latency)
+
+	def _restart(self):
+		self._start = self._clock()
+		self._conversions = 0
+
+	def _writeConfig(self, value):
+		old = self.regs[MCP9808_REG_CONFIG]
+		locks = old & MCP9808_REG_CONFIG_LOCKS
+		keep = 0
+		if locks:
+			keep |= MCP9808_REG_CONFIG_LOCKED_BY_ANY
+			if value & MCP9808_REG_CONFIG_SHUTDOWN:
+				keep |= MCP9808_REG_CONFIG_SHUTDOWN
+		if locks & MCP9808_REG_CONFIG_WINLOCKED:
+			keep |= MCP9808_REG_CONFIG_LOCKED_BY_WIN
+		new = (value & ~keep) | (old & keep) | locks
+		# Writing the interrupt clear bit clears the interrupt, the bit always reads 0
+		if new & MCP9808_REG_CONFIG_INTCLR:
+			self.interrupt = False
+		new &= ~MCP9808_REG_CONFIG_INTCLR
+		if (old & MCP9808_REG_CONFIG_SHUTDOWN) and not (new & MCP9808_REG_CONFIG_SHUTDOWN):
+			self._restart()
+		# The alert status bit is computed on every read
+		self.regs[MCP9808_REG_CONFIG] = new & 0x07FF & ~MCP9808_REG_CONFIG_ALERTSTAT
+
+	def _write(self, register, value):
+		config = self.regs[MCP9808_REG_CONFIG]
+		if register == MCP9808_REG_CONFIG:
+			self._writeConfig(value)
+		elif register in (MCP9808_REG_UPPER_TEMP, MCP9808_REG_LOWER_TEMP):
+			if not config & MCP9808_REG_CONFIG_WINLOCKED:
+				self.regs[register] = value & 0x1FFC
+		elif register == MCP9808_REG_CRIT_TEMP:
+			if not config & MCP9808_REG_CONFIG_CRITLOCKED:
+				self.regs[register] = value & 0x1FFC
+		elif register == MCP9808_REG_RESOLUTION:
+			self.regs[register] = value & 0x03
+			self._restart()
+
+	def _read(self, register):
+		self._update()
+		value = self.regs.get(register, 0x0000)
+		if register == MCP9808_REG_CONFIG and self._alertAsserted():
+			value |= MCP9808_REG_CONFIG_ALERTSTAT
+		return value
+
+	def readU16BE(self, register):
+		"""Read a 16 bit register MSB first"""
+		with self._lock:
+			self._transaction('read16', register)
+			value = self._read(register)
+			if register == MCP9808_REG_RESOLUTION:
+				# The resolution register is 8 bit wide, the second byte reads back as 0
+				return value << 8
+			return value
+
+	def readU8(self, register):
+		"""Read an 8 bit register, for 16 bit registers the MSB is returned"""
+		with self._lock:
+			self._transaction('read8', register)
+			value = self._read(register)
+			if register == MCP9808_REG_RESOLUTION:
+				return value
+			return value >> 8
+
+	def write16(self, register, value):
+		"""Write a SMBus word, the LSB goes first on the bus so the register gets the bytes swapped"""
+		with self._lock:
+			self._transaction('write16', register)
+			self._update()
+			self._write(register, ((value & 0xFF) << 8) | ((value >> 8) & 0xFF))
+
+	def write8(self, register, value):
+		"""Write an 8 bit register"""
+		with self._lock:
+			self._transaction('write8', register)
+			self._update()
+			self._write(register, value & 0xFF)
+
+
+class _MissingDevice(object):
+	"""Device handle for an address without a device, every transaction fails with IOError"""
+
+	def __init__(self, address, bus=None):
+		self.address = address
+		self._bus = bus
+
+	def _fail(self, *args):
+		if self._bus is not None:
+			self._bus._transaction()
+		raise IOError(errno.EREMOTEIO, 'No device at address {0:#04X}'.format(self.address))
+
+	readU16BE = readU8 = write16 = write8 = _fail
+
+
+class SimulatedBus(object):
+	"""Simulated I2C bus shared by the devices on the same bus number, it counts the transactions"""
+
+	def __init__(self, busnum):
+		self.busnum = busnum
+		self.transactions = 0
+		self.devices = {}
+
+	def _transaction(self):
+		self.transactions += 1
+
+
+class SimulatedI2C(object):
+	"""Drop in replacement of the Adafruit_GPIO.I2C module, get_i2c_device returns simulated MCP9808
+	devices. If autocreate is False only the devices added with addDevice answer, the rest of the
+	addresses fail like a device that does not acknowledge.
+	"""
+
+	def __init__(self, latency=0.0, autocreate=True, clock=_monotonic, default_bus=1):
+		self.latency = latency
+		self.autocreate = autocreate
+		self.default_bus = default_bus
+		self._clock = clock
+		self.buses = {}
+
+	def getBus(self, busnum=None):
+		"""Return the SimulatedBus for the bus number, creating it if needed"""
+		if busnum is None:
+			busnum = self.default_bus
+		bus = self.buses.get(busnum)
+		if bus is None:
+			bus = self.buses[busnum] = SimulatedBus(busnum)
+		return bus
+
+	def addDevice(self, address=MCP9808_I2CADDR_DEFAULT, busnum=None, **kwargs):
+		"""Add a simulated MCP9808 to a bus and return it"""
+		bus = self.getBus(busnum)
+		kwargs.setdefault('latency', self.latency)
+		kwargs.setdefault('clock', self._clock)
+		device = bus.devices[address] = SimulatedMCP9808(address, bus=bus, **kwargs)
+		return device
+
+	def get_i2c_device(self, address, busnum=None, i2c_interface=None, **kwargs):
+		"""Return the device on the address and bus number"""
+		bus = self.getBus(busnum)
+		device = bus.devices.get(address)
+		if device is None:
+			if not self.autocreate:
+				return _MissingDevice(address, bus)
+			device = self.addDevice(address, bus.busnum)
+		return device
+
+	@property
+	def transactions(self):
+		"""Number of transactions on every bus"""
+		return sum(bus.transactions for bus in self.buses.values())
+
+	def reverseByteOrder(self, data):
+		"""Reverse the byte order of an integer"""
+		return reverseByteOrder(data)
+
+
+class SimulatedI2CDevIoctl(object):
+	"""Replacement of fcntl.ioctl for MCP9808.i2cdev.LinuxI2C, it runs the I2C_RDWR transfers on the
+	devices of a SimulatedI2C. The bus number is the number at the end of the path of the file
+	descriptor, any file can be used as the bus device:
+
+		bus = SimulatedI2C()
+		i2c = LinuxI2C(ioctl=SimulatedI2CDevIoctl(bus), path='/tmp/i2c-{0}')
+	"""
+
+	_msg = struct.Struct('@HHHP')
+	_rdwr = struct.Struct('@PI0P')
+
+	def __init__(self, i2c):
+		self.i2c = i2c
+		self.calls = 0
+
+	def _busnum(self, fd):
+		match = re.search(r'(\d+)$', os.readlink('/proc/self/fd/{0}'.format(fd)))
+		return int(match.group(1)) if match else None
+
+	def __call__(self, fd, request, arg, mutate=True):
+		from MCP9808.i2cdev import I2C_RDWR, I2C_M_RD
+		if request != I2C_RDWR:
+			raise IOError(errno.ENOTTY, 'Unsupported ioctl {0:#06X}'.format(request))
+		self.calls += 1
+		busnum = self._busnum(fd)
+		pointer, count = self._rdwr.unpack(bytes(arg))
+		msgs = [self._msg.unpack(ctypes.string_at(pointer + i * self._msg.size, self._msg.size)) for i in range(count)]
+		register = None
+		for address, flags, length, buf in msgs:
+			device = self.i2c.get_i2c_device(address, busnum)
+			if flags & I2C_M_RD:
+				if length == 2:
+					data = struct.pack('>H', device.readU16BE(register))
+				else:
+					data = struct.pack('B', device.readU8(register))[:length]
+				ctypes.memmove(buf, data, len(data))
+				continue
+			data = bytearray(ctypes.string_at(buf, length))
+			register = data[0]
+			if length == 2:
+				device.write8(register, data[1])
+			elif length == 3:
+				device.write16(register, data[1] | (data[2] << 8))
+		return 0
@@ -0,0 +1,200 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Compact binary log of raw ambient temperature register words.
+
+The file starts with a 32 byte header followed by 8 byte records, all little endian:
+
+	header: magic 'MCP9808T', version (uint16), record size (uint16), base time in seconds since
+	        the epoch (double), tick in seconds (double), 4 reserved bytes
+	record: time since the base time in ticks (uint32), bus number (uint8), address (uint8),
+	        raw ambient temperature register word (uint16)
+
+	from MCP9808.tslog import TSLogWriter, TSLogReader
+
+	with TSLogWriter('temps.log') as log:
+		log.append(0x18, sensor.readTempRaw())
+
+	with TSLogReader('temps.log') as log:
+		temps = log.tempC()
+"""
+from array import array
+import mmap
+import os
+import struct
+import sys
+import time
+
+from MCP9808.mcp9808 import decodeTemps
+
+TSLOG_MAGIC                    = b'MCP9808T'
+TSLOG_VERSION                  = 1
+
+_header = struct.Struct('<8sHHdd4x')
+_record = struct.Struct('<IBBH')
+
+# numpy dtype of a record.
+TSLOG_DTYPE                    = [('ticks', '<u4'), ('busnum', 'u1'), ('address', 'u1'), ('raw', '<u2')]
+
+
+def _readHeader(f):
+	data = f.read(_header.size)
+	if len(data) < _header.size:
+		raise ValueError('Not a MCP9808 log, the header is truncated')
+	magic, version, size, base, tick = _header.unpack(data)
+	if magic != TSLOG_MAGIC:
+		raise ValueError('Not a MCP9808 log, wrong magic {0!r}'.format(magic))
+	if version != TSLOG_VERSION or size != _record.size:
+		raise ValueError('Unsupported MCP9808 log version {0} with {1} byte records'.format(version, size))
+	return base, tick
+
+
+class TSLogWriter(object):
+	"""Append records to a log file, the header is written when the file is created, otherwise the base
+	time and tick of the existing header are used. The tick sets the time resolution, with the default
+	of 10 ms a file covers 497 days from its base time."""
+
+	def __init__(self, path, tick=0.01, base=None):
+		self.path = path
+		self._f = open(path, 'ab')
+		if self._f.tell() == 0:
+			self.base = time.time() if base is None else base
+			self.tick = tick
+			self._f.write(_header.pack(TSLOG_MAGIC, TSLOG_VERSION, _record.size, self.base, self.tick))
+		else:
+			with open(path, 'rb') as f:
+				self.base, self.tick = _readHeader(f)
+			# Drop a partial record left by an interrupted write
+			end = _header.size + (self._f.tell() - _header.size) // _record.size * _record.size
+			if end != self._f.tell():
+				self._f.truncate(end)
+				self._f.seek(end)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+		return False
+
+	def append(self, address, raw, timestamp=None, busnum=0):
+		"""Append a raw ambient temperature word, timestamp is in seconds since the epoch, now by default"""
+		if timestamp is None:
+			timestamp = time.time()
+		ticks = int(round((timestamp - self.base) / self.tick))
+		if not 0 <= ticks <= 0xFFFFFFFF:
+			raise ValueError('Timestamp {0} is out of the range of the log'.format(timestamp))
+		self._f.write(_record.pack(ticks, busnum, address, raw & 0xFFFF))
+
+	def flush(self):
+		self._f.flush()
+
+	def close(self):
+		self._f.close()
+
+
+class TSLogReader(object):
+	"""Memory mapped read only view of a log file. ticks(), busnums(), addresses() and words() return
+	zero copy memoryviews on little endian hosts, numpy() returns a zero copy structured array."""
+
+	def __init__(self, path):
+		self.path = path
+		self._f = open(path, 'rb')
+		self.base, self.tick = _readHeader(self._f)
+		size = os.fstat(self._f.fileno()).st_size
+		# A partial record at the end is ignored
+		self._count = (size - _header.size) // _record.size
+		self._mmap = None
+		if self._count:
+			self._mmap = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+			self._data = memoryview(self._mmap)[_header.size:_header.size + self._count * _record.size]
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+		return False
+
+	def __len__(self):
+		return self._count
+
+	def __iter__(self):
+		"""Yield (timestamp, busnum, address, raw) for every record"""
+		for i in range(self._count):
+			ticks, busnum, address, raw = _record.unpack_from(self._data, i * _record.size)
+			yield self.base + ticks * self.tick, busnum, address, raw
+
+	def close(self):
+		"""Release the map, the views returned before must not be used any more"""
+		if self._mmap is not None:
+			try:
+				self._data.release()
+				self._mmap.close()
+			except BufferError:
+				# A view is still exported, the map is released with the last one
+				pass
+			self._mmap = None
+		self._f.close()
+
+	def _field(self, fmt, offset, width):
+		# Strided view of a record field
+		if not self._count:
+			return array(fmt)
+		step = _record.size // width
+		if sys.byteorder == 'little' or width == 1:
+			return self._data.cast(fmt)[offset // width::step]
+		values = array(fmt, self._data.cast(fmt)[offset // width::step].tolist())
+		values.byteswap()
+		return values
+
+	def ticks(self):
+		"""Time of every record in ticks since the base time"""
+		return self._field('I', 0, 4)
+
+	def busnums(self):
+		"""Bus number of every record"""
+		return self._field('B', 4, 1)
+
+	def addresses(self):
+		"""Sensor address of every record"""
+		return self._field('B', 5, 1)
+
+	def words(self):
+		"""Raw ambient temperature register word of every record"""
+		return self._field('H', 6, 2)
+
+	def timestamps(self):
+		"""Time of every record in seconds since the epoch as an array('d')"""
+		base = self.base
+		tick = self.tick
+		return array('d', [base + ticks * tick for ticks in self.ticks()])
+
+	def tempC(self):
+		"""Temperature in degrees celsius of every record, see MCP9808.mcp9808.decodeTemps"""
+		return decodeTemps(self.words())
+
+	def numpy(self):
+		"""Return the records as a zero copy numpy structured array with the fields ticks, busnum,
+		address and raw, decodeTemps(log.numpy()['raw']) converts them to degrees celsius"""
+		import numpy
+		if not self._count:
+			return numpy.zeros(0, dtype=TSLOG_DTYPE)
+		return numpy.frombuffer(self._data, dtype=TSLOG_DTYPE)
@@ -0,0 +1,200 @@
+"""Benchmarks of the MCP9808 library hot paths and bus usage, they run against the simulated MCP9808 so
+no hardware is needed. The results are printed and can be saved as JSON to compare two versions:
+
+	python benchmark/benchmark.py --output before.json
+	python benchmark/benchmark.py --output after.json --compare before.json
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, _ROOT)
+
+import MCP9808.mcp9808 as MCP9808
+from MCP9808.manager import MCP9808Manager
+from MCP9808.simulator import SimulatedI2C
+
+_perf_counter = getattr(time, 'perf_counter', time.time)
+
+# Run in a new interpreter by benchStartup, prints the timings as JSON.
+_STARTUP = """
+import json, sys, time
+perf_counter = getattr(time, 'perf_counter', time.time)
+start = perf_counter()
+import MCP9808.mcp9808 as MCP9808
+imported = perf_counter()
+from MCP9808.simulator import SimulatedI2C
+bus = SimulatedI2C()
+start_construct = perf_counter()
+sensor = MCP9808.MCP9808(i2c=bus)
+constructed = perf_counter()
+sensor.begin()
+sensor.readTempC()
+read = perf_counter()
+print(json.dumps({'import': imported - start, 'construct': constructed - start_construct,
+	'first_read': read - constructed, 'adafruit': 'Adafruit_GPIO' in sys.modules}))
+"""
+
+
+def rate(function, duration):
+	"""Call function repeatedly for about duration seconds, returns the calls per second"""
+	calls = 0
+	batch = 1
+	start = _perf_counter()
+	elapsed = 0.0
+	while elapsed < duration:
+		for i in range(batch):
+			function()
+		calls += batch
+		batch *= 2
+		elapsed = _perf_counter() - start
+	return calls / elapsed
+
+
+def benchReadTempC(duration):
+	"""readTempC calls per second and decode cost"""
+	bus = SimulatedI2C()
+	sensor = MCP9808.MCP9808(i2c=bus)
+	words = [raw for raw in range(0, 0x10000, 3)]
+	# Build the lookup table before timing
+	MCP9808.decodeTemps(words[:1])
+	start = _perf_counter()
+	for raw in words:
+		MCP9808.decodeTemp(raw)
+	scalar = (_perf_counter() - start) / len(words)
+	start = _perf_counter()
+	MCP9808.decodeTemps(words)
+	bulk = (_perf_counter() - start) / len(words)
+	return {
+		'readTempC_per_sec': rate(sensor.readTempC, duration),
+		'read_per_sec': rate(sensor.read, duration),
+		'decodeTemp_ns': scalar * 1e9,
+		'decodeTemps_ns_per_word': bulk * 1e9,
+	}
+
+
+def _transactions(bus, function):
+	before = bus.transactions
+	function()
+	return bus.transactions - before
+
+
+def benchTransactions():
+	"""Bus transactions of every logical operation, without and with the register cache"""
+	results = {}
+	for cache in (False, True):
+		bus = SimulatedI2C()
+		sensor = MCP9808.MCP9808(i2c=bus, cache=cache)
+		if cache:
+			sensor.refresh()
+		operations = (
+			('readTempC', sensor.readTempC),
+			('setAlertCtrl', sensor.setAlertCtrl),
+			('setTempHyst', lambda: sensor.setTempHyst(1.5)),
+			('setUpperTemp', lambda: sensor.setUpperTemp(30.0)),
+			('begin', sensor.begin),
+		)
+		results['cache' if cache else 'nocache'] = dict((name, _transactions(bus, function)) for name, function in operations)
+	return results
+
+
+def benchPolling(duration, buses=3, sensors=8, latency=0.0002):
+	"""Readings per second of a MCP9808Manager polling every sensor of several buses"""
+	bus = SimulatedI2C(latency=latency, autocreate=False)
+	for busnum in range(1, buses + 1):
+		for address in range(0x18, 0x18 + sensors):
+			bus.addDevice(address, busnum)
+	with MCP9808Manager(buses=range(1, buses + 1), i2c=bus) as manager:
+		manager.discover()
+		polls = rate(manager.poll, duration)
+	return {
+		'buses': buses,
+		'sensors': buses * sensors,
+		'latency': latency,
+		'polls_per_sec': polls,
+		'readings_per_sec': polls * buses * sensors,
+	}
+
+
+def _median(values):
+	values = sorted(values)
+	return values[len(values) // 2]
+
+
+def benchStartup(runs=5):
+	"""Import, construction and begin() plus first read latencies of a new process, the median of runs
+	processes. total is the wall time of the whole process including the interpreter startup"""
+	env = dict(os.environ)
+	env['PYTHONPATH'] = os.pathsep.join([_ROOT] + [path for path in [env.get('PYTHONPATH')] if path])
+	results = []
+	for i in range(runs):
+		start = _perf_counter()
+		output = subprocess.check_output([sys.executable, '-c', _STARTUP], env=env)
+		total = _perf_counter() - start
+		result = json.loads(output.decode('utf-8'))
+		result['total'] = total
+		results.append(result)
+	startup = dict((key + '_ms', _median([result[key] for result in results]) * 1e3)
+		for key in ('import', 'construct', 'first_read', 'total'))
+	startup['adafruit_imported'] = any(result['adafruit'] for result in results)
+	return startup
+
+
+def run(duration):
+	return {
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'readTempC': benchReadTempC(duration),
+		'transactions': benchTransactions(),
+		'polling': benchPolling(duration),
+		'startup': benchStartup(),
+	}
+
+
+def _flatten(results, prefix=''):
+	flat = {}
+	for key, value in results.items():
+		if isinstance(value, dict):
+			flat.update(_flatten(value, prefix + key + '.'))
+		elif isinstance(value, (int, float)):
+			flat[prefix + key] = value
+	return flat
+
+
+def compare(old, new):
+	"""Print every numeric result of new next to old and the ratio new / old"""
+	old = _flatten(old)
+	for key, value in sorted(_flatten(new).items()):
+		if key in old and old[key]:
+			print('{0:45} {1:>14.3f} {2:>14.3f} {3:>8.2f}x'.format(key, old[key], value, float(value) / old[key]))
+		else:
+			print('{0:45} {1:>14} {2:>14.3f}'.format(key, '-', value))
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--duration', type=float, default=1.0, help='seconds per throughput benchmark')
+	parser.add_argument('--output', help='save the results as JSON')
+	parser.add_argument('--compare', help='JSON results of a previous run to compare with')
+	args = parser.parse_args()
+	results = run(args.duration)
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=2, sort_keys=True)
+	if args.compare:
+		with open(args.compare) as f:
+			compare(json.load(f), results)
+	else:
+		print(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+	main()
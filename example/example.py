@@ -37,9 +37,9 @@ print 'Config register: {0:#06X}'.format(sensor.getConfigReg())
 # Loop printing measurements every second.
 print 'Press Ctrl-C to quit.'
 while True:
-	temp = sensor.readTempC()
-	# Read the temperature
-	print 'Temperature: {0:0.3F}*C'.format(temp)
-	# Read the 3 bits to know why the alert is set, read the datasheet to kno more
-	print 'Sensor Alert Output: {0:#05b}'.format(sensor.getAlertOutput())
+	# Read the temperature and the alert bits with a single register read
+	reading = sensor.read()
+	print 'Temperature: {0:0.3F}*C'.format(reading.tempC)
+	# The 3 bits to know why the alert is set, read the datasheet to kno more
+	print 'Sensor Alert Output: {0:#05b}'.format(reading.alert)
 	time.sleep(1.0)
@@ -0,0 +1,280 @@
+# Copyright (c) 2014 Miguel Ercolino
+# Author: Miguel Ercolino
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Bus transactions and register state of the driver on the simulated MCP9808, run with:
+
+	python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import MCP9808.mcp9808 as mcp
+from MCP9808.simulator import SimulatedI2C, SimulatedI2CDevIoctl
+
+
+class Clock(object):
+	"""Clock of the simulated devices, the conversions only happen when the test moves it"""
+
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self):
+		return self.now
+
+
+class SimulatedTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.clock = Clock()
+		self.bus = SimulatedI2C(clock=self.clock)
+		self.device = self.bus.get_i2c_device(mcp.MCP9808_I2CADDR_DEFAULT)
+
+	def sensor(self, **kwargs):
+		return mcp.MCP9808(i2c=self.bus, **kwargs)
+
+	def count(self, function, *args):
+		"""Run function and return the number of bus transactions it took"""
+		start = self.bus.transactions
+		function(*args)
+		return self.bus.transactions - start
+
+
+class CacheTest(SimulatedTestCase):
+
+	def test_getters_served_from_memory(self):
+		sensor = self.sensor(cache=True)
+		self.assertEqual(self.count(sensor.refresh), 5)
+		self.assertEqual(self.count(sensor.getConfigReg), 0)
+		self.assertEqual(self.count(sensor.getUpperTemp), 0)
+		self.assertEqual(self.count(sensor.getResolution), 0)
+
+	def test_setters_only_write(self):
+		sensor = self.sensor(cache=True)
+		sensor.refresh()
+		self.assertEqual(self.count(sensor.setAlertCtrl), 1)
+		self.assertEqual(self.count(sensor.setUpperTemp, 30.0), 1)
+		self.assertEqual(sensor.getUpperTemp(), 30.0)
+		self.assertEqual(self.device.regs[mcp.MCP9808_REG_CONFIG], mcp.MCP9808_REG_CONFIG_ALERTCTRL)
+
+	def test_uncached_reads_every_time(self):
+		sensor = self.sensor()
+		self.assertEqual(self.count(sensor.getConfigReg), 1)
+		self.assertEqual(self.count(sensor.getConfigReg), 1)
+
+	def test_locked_registers(self):
+		sensor = self.sensor(cache=True)
+		sensor.setCritTemp(80.0)
+		sensor.setTempHyst(1.5)
+		sensor.setCritLock()
+		sensor.setCritTemp(50.0)
+		sensor.setTempHyst(6)
+		sensor.clearConfigReg()
+		self.assertEqual(sensor.getCritTemp(), 80.0)
+		config = self.device.readU16BE(mcp.MCP9808_REG_CONFIG) & ~mcp.MCP9808_REG_CONFIG_ALERTSTAT
+		self.assertEqual(sensor.getConfigReg(), config)
+		self.assertTrue(sensor.isLock())
+		self.assertEqual(config & mcp.MCP9808_REG_CONFIG_HYST, mcp.MCP9808_HYST_BITS[1.5])
+
+	def test_alert_status_not_cached(self):
+		sensor = self.sensor(cache=True)
+		sensor.setCritTemp(80.0)
+		sensor.setUpperTemp(30.0)
+		sensor.setAlertCtrl()
+		self.device.temperature = 35.0
+		self.clock.now += 1.0
+		sensor.refresh()
+		self.assertTrue(self.device.readU16BE(mcp.MCP9808_REG_CONFIG) & mcp.MCP9808_REG_CONFIG_ALERTSTAT)
+		self.assertFalse(sensor.getConfigReg() & mcp.MCP9808_REG_CONFIG_ALERTSTAT)
+
+	def test_refresh_updates_conversion_time(self):
+		sensor = self.sensor(cache=True)
+		self.assertEqual(sensor.conversionTime(), 0.250)
+		self.device.write8(mcp.MCP9808_REG_RESOLUTION, 0x00)
+		sensor.refresh()
+		self.assertEqual(sensor.conversionTime(), 0.030)
+
+	def test_set_resolution_result(self):
+		for cache in (False, True):
+			self.assertEqual(self.sensor(cache=cache).setResolution(0.25), [1, 0x01])
+
+
+class ConfigureTest(SimulatedTestCase):
+
+	def test_one_read_one_write(self):
+		sensor = self.sensor()
+		def configure():
+			with sensor.configure() as cfg:
+				cfg.alert_ctrl = True
+				cfg.alert_mode = True
+				cfg.hysteresis = 3
+		self.assertEqual(self.count(configure), 2)
+		self.assertEqual(self.device.regs[mcp.MCP9808_REG_CONFIG], 0x0409)
+
+	def test_clear_only_writes(self):
+		sensor = self.sensor()
+		sensor.setShutdown()
+		def configure():
+			with sensor.configure(clear=True) as cfg:
+				cfg.alert_pol = True
+		self.assertEqual(self.count(configure), 1)
+		self.assertEqual(self.device.regs[mcp.MCP9808_REG_CONFIG], mcp.MCP9808_REG_CONFIG_ALERTPOL)
+
+	def test_verify(self):
+		sensor = self.sensor()
+		sensor.setCritLock()
+		cfg = sensor.configure(clear=True, verify=True)
+		with cfg:
+			cfg.hysteresis = 6
+		self.assertFalse(cfg.verified)
+		self.assertEqual(self.device.regs[mcp.MCP9808_REG_CONFIG], mcp.MCP9808_REG_CONFIG_CRITLOCKED)
+
+
+class CoalesceTest(SimulatedTestCase):
+
+	def test_reads_within_a_conversion(self):
+		sensor = self.sensor(coalesce=True)
+		sensor.conversionTime()
+		def readTwice():
+			sensor.readTempC()
+			sensor.read()
+		self.assertEqual(self.count(readTwice), 1)
+
+	def test_resolution_change_drops_the_value(self):
+		sensor = self.sensor(coalesce=True)
+		sensor.readTempC()
+		sensor.setResolution(0.5)
+		self.assertEqual(self.count(sensor.readTempC), 1)
+
+	def test_without_coalescing(self):
+		sensor = self.sensor()
+		self.assertEqual(self.count(lambda: [sensor.readTempC() for i in range(3)]), 3)
+
+
+class OneShotTest(SimulatedTestCase):
+
+	def setUp(self):
+		# readOneShot() sleeps for the conversion, the device runs on the real clock
+		self.bus = SimulatedI2C()
+		self.device = self.bus.get_i2c_device(mcp.MCP9808_I2CADDR_DEFAULT)
+		self.device.regs[mcp.MCP9808_REG_RESOLUTION] = 0x00
+
+	def test_transactions(self):
+		sensor = self.sensor()
+		self.assertEqual(self.count(sensor.readOneShot), 5)
+		self.assertEqual(self.count(sensor.readOneShot), 4)
+		cached = self.sensor(cache=True)
+		cached.refresh()
+		self.assertEqual(self.count(cached.readOneShot), 3)
+
+	def test_leaves_the_sensor_shut_down(self):
+		sensor = self.sensor(cache=True)
+		self.device.temperature = 21.5
+		reading = sensor.readOneShot()
+		self.assertEqual(reading.tempC, 21.5)
+		self.assertTrue(self.device.regs[mcp.MCP9808_REG_CONFIG] & mcp.MCP9808_REG_CONFIG_SHUTDOWN)
+
+
+class SnapshotTest(SimulatedTestCase):
+
+	def test_restore_writes_the_differences(self):
+		sensor = self.sensor()
+		sensor.setUpperTemp(30.0)
+		sensor.setAlertCtrl()
+		snapshot = sensor.snapshot()
+		self.device.reset()
+		sensor.setUpperTemp(30.0)
+		written, skipped = sensor.restore(snapshot)
+		self.assertEqual(written, [mcp.MCP9808_REG_CONFIG])
+		self.assertEqual(skipped, [])
+		self.assertEqual(sensor.snapshot(), snapshot)
+
+	def test_restore_with_locks(self):
+		sensor = self.sensor()
+		snapshot = mcp.MCP9808Snapshot(config=mcp.MCP9808_REG_CONFIG_ALERTCTRL, upper=mcp.encodeTemp(30.0),
+			lower=mcp.encodeTemp(10.0), crit=mcp.encodeTemp(80.0), resolution=0x01)
+		sensor.setWinLock()
+		written, skipped = sensor.restore(snapshot)
+		self.assertEqual(sorted(written), [mcp.MCP9808_REG_CRIT_TEMP, mcp.MCP9808_REG_RESOLUTION])
+		self.assertEqual(sorted(skipped), [mcp.MCP9808_REG_CONFIG, mcp.MCP9808_REG_UPPER_TEMP,
+			mcp.MCP9808_REG_LOWER_TEMP])
+		self.assertEqual(self.device.regs[mcp.MCP9808_REG_CONFIG], mcp.MCP9808_REG_CONFIG_WINLOCKED)
+		self.assertEqual(self.device.regs[mcp.MCP9808_REG_UPPER_TEMP], 0x0000)
+		# Nothing left that can be written
+		self.assertEqual(self.count(sensor.restore, snapshot), 5)
+
+
+class BatchedPollTest(unittest.TestCase):
+
+	def setUp(self):
+		from MCP9808.i2cdev import LinuxI2C
+		# The simulated ioctl takes the bus number from the end of the device path
+		self.dir = tempfile.mkdtemp()
+		for busnum in (1, 2):
+			open(os.path.join(self.dir, 'i2c-{0}'.format(busnum)), 'w').close()
+		self.bus = SimulatedI2C(autocreate=False)
+		for address in range(0x18, 0x1C):
+			self.bus.addDevice(address, 1, temperature=20.0 + address - 0x18)
+		self.bus.addDevice(0x18, 2, temperature=-5.25)
+		self.ioctl = SimulatedI2CDevIoctl(self.bus)
+		self.i2c = LinuxI2C(ioctl=self.ioctl, path=os.path.join(self.dir, 'i2c-{0}'))
+
+	def tearDown(self):
+		self.i2c.close()
+		shutil.rmtree(self.dir)
+
+	def poll(self, manager):
+		start = self.ioctl.calls
+		readings = manager.poll()
+		return self.ioctl.calls - start, readings
+
+	def test_one_transfer_per_bus(self):
+		from MCP9808.manager import MCP9808Manager
+		with MCP9808Manager(buses=(1, 2), i2c=self.i2c) as manager:
+			self.assertEqual(manager.discover(), 5)
+			calls, readings = self.poll(manager)
+		self.assertEqual(calls, 2)
+		self.assertEqual(readings[(1, 0x1B)].tempC, 23.0)
+		self.assertEqual(readings[(2, 0x18)].tempC, -5.25)
+
+	def test_missing_device(self):
+		from MCP9808.manager import MCP9808Manager
+		with MCP9808Manager(buses=(1,), i2c=self.i2c) as manager:
+			manager.discover()
+			del self.bus.buses[1].devices[0x1A]
+			calls, readings = self.poll(manager)
+		# The failed transfer then one transfer per sensor
+		self.assertEqual(calls, 5)
+		self.assertIsNone(readings[(1, 0x1A)])
+		self.assertEqual(readings[(1, 0x19)].tempC, 21.0)
+
+	def test_instrumented_sensors_read_one_by_one(self):
+		from MCP9808.manager import MCP9808Manager
+		with MCP9808Manager(buses=(1,), i2c=self.i2c) as manager:
+			manager.discover()
+			manager.sensors[1][0][1].instrument()
+			calls, readings = self.poll(manager)
+		self.assertEqual(calls, 4)
+		self.assertEqual(manager.sensors[1][0][1].stats()['transactions'], 1)
+
+
+if __name__ == '__main__':
+	unittest.main()